@@ -1,18 +1,22 @@
 
 from utils import validate_date
+import uuid
 import logging
 import tkinter as tk
 from tkinter import messagebox
 from tkcalendar import DateEntry
 from exceptions import OverdrawError, TransactionLimitError, TransactionSequenceError
+from account import Account
 
 
 class AddTransactionDialog(tk.Toplevel):
     """Dialog for adding a transaction"""
-    def __init__(self, parent, session, selected_account):
+    def __init__(self, parent, worker, account_id):
         super().__init__(parent)
-        self.session = session
-        self.selected_account = selected_account
+        self.worker = worker
+        self.account_id = account_id
+        # Submitting again after an error cannot post the transaction twice if the first attempt did go through
+        self.request_key = uuid.uuid4().hex
         self.title("Add Transaction")
         self.create_widgets()
 
@@ -27,7 +31,8 @@ class AddTransactionDialog(tk.Toplevel):
         DateEntry(self, width = 12, background = "darkblue", foreground = "white", borderwidth = 2, textvariable = self.date_var, date_pattern = "yyyy-MM-dd").pack()
         tk.Entry(self, textvariable = self.date_var).pack()
         
-        tk.Button(self, text = "Submit", command = self._submit_transaction).pack()
+        self.submit_button = tk.Button(self, text = "Submit", command = self._submit_transaction)
+        self.submit_button.pack()
 
     def _submit_transaction(self):
         """Handle transaction submission"""
@@ -42,18 +47,34 @@ class AddTransactionDialog(tk.Toplevel):
             messagebox.showerror("Date Error", "Please enter a valid date in YYYY-MM-DD format or select a date using the picker.")
             return
         
-        try:
-            self.selected_account.add_transaction(self.session, amount, date)
-            messagebox.showinfo("Success", "Transaction added successfully!")
-            logging.debug(f"Created transaction: {self.selected_account.account_number}, {amount}")
-            logging.debug("Saved to bank.db")
-            self.destroy()
-        except OverdrawError:
+        account_id, request_key = self.account_id, self.request_key
+        self.submit_button.config(state = tk.DISABLED, text = "Submitting...")
+        self.worker.submit(lambda session: _post(session, account_id, amount, date, request_key), self._transaction_added, self._transaction_failed)
+
+    def _transaction_added(self, posted):
+        """Report the posted transaction and close the dialog"""
+        messagebox.showinfo("Success", "Transaction added successfully!")
+        logging.debug(f"Created transaction: {posted}")
+        logging.debug("Saved to bank.db")
+        self.destroy()
+
+    def _transaction_failed(self, e):
+        """Report why the transaction could not be posted and let the user try again"""
+        if self.winfo_exists():
+            self.submit_button.config(state = tk.NORMAL, text = "Submit")
+        if isinstance(e, OverdrawError):
             messagebox.showerror("Transaction Error", "Insufficient balance for this transaction.")
-        except TransactionLimitError as e:
+        elif isinstance(e, TransactionLimitError):
             messagebox.showerror("Transaction Error", f"This transaction could not be completed because this account already has {e.limit_value} transactions in this {e.limit_type}.")
-        except TransactionSequenceError as e:
+        elif isinstance(e, TransactionSequenceError):
             messagebox.showerror("Transaction Error", f"New transactions must be from {e.latest_transaction_date} onward.")
-        except Exception as e:
+        else:
+            logging.error(f"{type(e).__name__}: {repr(e)}")
             messagebox.showerror("Error", "An unexpected error occurred. Check logs.")
 
+
+def _post(session, account_id, amount, date, request_key = None):
+    """Post the transaction on the worker thread and return the account number with the amount for logging"""
+    account = session.get(Account, account_id)
+    account.add_transaction(session, amount, date, idempotency_key = request_key)
+    return f"{account.account_number}, {amount}"
@@ -0,0 +1,63 @@
+
+import logging
+import tkinter as tk
+from tkinter import ttk, messagebox
+from queries import transaction_history
+from events import ChangeFeed
+
+
+class HistoryDialog(tk.Toplevel):
+    """Dialog for displaying the transaction history of an account, new postings are added as they are committed"""
+    def __init__(self, parent, worker, account_id):
+        super().__init__(parent)
+        self.worker = worker
+        self.account_id = account_id
+        self.title("Transaction History")
+        self.create_widgets()
+        self.feed = ChangeFeed(self, self._apply_changes)
+
+    def create_widgets(self):
+        """Create widgets for the dialog"""
+        self.loading = tk.Label(self, text = "Loading...")
+        self.loading.pack()
+        tree = ttk.Treeview(self, columns = ("Date", "Amount"), show = "headings")
+        tree.heading("Date", text = "Date")
+        tree.heading("Amount", text = "Amount")
+        tree.tag_configure("red", foreground = "red")
+        tree.tag_configure("green", foreground = "green")
+        tree.pack()
+        self.tree = tree
+        account_id = self.account_id
+        self.worker.submit(lambda session: transaction_history(session, account_id), self._show_rows, self._load_failed)
+
+    def _insert(self, transaction_id, date, amount, index = "end"):
+        """Add a transaction to the table unless it is already shown"""
+        if self.tree.exists(str(transaction_id)):
+            return
+        color = "red" if amount < 0 else "green"
+        self.tree.insert("", index, iid = str(transaction_id), values = (date, amount), tags = (color,))
+
+    def _show_rows(self, rows):
+        """Fill the table once the worker has loaded the history"""
+        if not self.winfo_exists():
+            return
+        # Postings committed while the history was loading are already on screen and stay below it
+        for index, row in enumerate(rows):
+            self._insert(row.transaction_id, row.date, row.amount, index)
+        self.loading.pack_forget()
+
+    def _load_failed(self, e):
+        """Report that the transaction history could not be loaded"""
+        logging.error(f"{type(e).__name__}: {repr(e)}")
+        if not self.winfo_exists():
+            return
+        self.loading.config(text = "Could not load the history.")
+        self.loading.pack(before = self.tree)
+        messagebox.showerror("Error", "The transaction history could not be loaded. Please try again, or check the logs.")
+
+    def _apply_changes(self, accounts, transactions):
+        """Append the postings of this account that were committed since the last refresh"""
+        for account_id, transaction_id, date, amount, _ in transactions:
+            if account_id == self.account_id:
+                self._insert(transaction_id, date, amount)
+
@@ -9,9 +9,9 @@ from checking_account import CheckingAccount
 
 class OpenAccountDialog(tk.Toplevel):
     """Dialog for opening a new account"""
-    def __init__(self, parent, session):
+    def __init__(self, parent, worker):
         super().__init__(parent)
-        self.session = session
+        self.worker = worker
         self.title("Open Account")
         self.create_widgets()
 
@@ -23,20 +23,40 @@ class OpenAccountDialog(tk.Toplevel):
         tk.Radiobutton(self, text = "Checking", variable = self.account_type_var, value = "checking").pack()
         tk.Radiobutton(self, text = "Savings", variable = self.account_type_var, value = "savings").pack()
         
-        tk.Button(self, text = "Submit", command = self._submit_account_type).pack()
+        self.submit_button = tk.Button(self, text = "Submit", command = self._submit_account_type)
+        self.submit_button.pack()
 
     def _submit_account_type(self):
         """Handle account type submission"""
         account_type = self.account_type_var.get()
-        if account_type == "savings":
-            new_account = SavingAccount(account_type)
-        else:
-            new_account = CheckingAccount(account_type)
-        
-        account_number = new_account.generate_account_number(self.session)
-        self.session.add(new_account)
-        self.session.commit()
+        self.submit_button.config(state = tk.DISABLED, text = "Submitting...")
+        self.worker.submit(lambda session: _open(session, account_type), self._account_opened, self._account_failed)
+
+    def _account_opened(self, account):
+        """Report the new account and close the dialog"""
+        account_type, account_number = account
         logging.debug(f"Created account: {account_number}")
         logging.debug("Saved to bank.db")
         messagebox.showinfo("Success", f"{account_type.capitalize()} account created successfully!")
-        self.destroy()
\ No newline at end of file
+        self.destroy()
+
+    def _account_failed(self, e):
+        """Report why the account could not be opened and let the user try again"""
+        logging.error(f"{type(e).__name__}: {repr(e)}")
+        if not self.winfo_exists():
+            return
+        self.submit_button.config(state = tk.NORMAL, text = "Submit")
+        messagebox.showerror("Error", "The account could not be opened. Check logs.")
+
+
+def _open(session, account_type):
+    """Create the account on the worker thread and return its type and number"""
+    if account_type == "savings":
+        new_account = SavingAccount(account_type)
+    else:
+        new_account = CheckingAccount(account_type)
+    
+    account_number = new_account.generate_account_number(session)
+    session.add(new_account)
+    session.commit()
+    return account_type, account_number
@@ -0,0 +1,129 @@
+
+import logging
+import tkinter as tk
+from tkinter import ttk, messagebox
+from utils import validate_date
+from transaction_search import search_transactions, TRANSACTION_TYPES
+
+
+class SearchTransactionsDialog(tk.Toplevel):
+    """Dialog for searching the transactions of every account by date, amount, type and account"""
+    def __init__(self, parent, worker):
+        super().__init__(parent)
+        self.worker = worker
+        self.filters = None
+        self.cursors = []
+        self.next_cursor = None
+        self.title("Search Transactions")
+        self.create_widgets()
+
+    def create_widgets(self):
+        """Create widgets for the dialog"""
+        panel = tk.Frame(self)
+        panel.pack()
+        self.entries = {}
+        fields = [
+            ("From (YYYY-MM-DD):", "start_date"),
+            ("To (YYYY-MM-DD):", "end_date"),
+            ("Min amount:", "min_amount"),
+            ("Max amount:", "max_amount"),
+            ("Account number:", "account_number"),
+        ]
+        for row, (text, name) in enumerate(fields):
+            tk.Label(panel, text = text).grid(row = row, column = 0, sticky = "e")
+            self.entries[name] = tk.Entry(panel)
+            self.entries[name].grid(row = row, column = 1)
+        tk.Label(panel, text = "Type:").grid(row = len(fields), column = 0, sticky = "e")
+        self.type_var = tk.StringVar(value = "All")
+        ttk.Combobox(panel, textvariable = self.type_var, values = ("All",) + TRANSACTION_TYPES, state = "readonly").grid(row = len(fields), column = 1)
+        self.search_button = tk.Button(self, text = "Search", command = self._search)
+        self.search_button.pack()
+
+        tree = ttk.Treeview(self, columns = ("Account Number", "Date", "Amount", "Type"), show = "headings")
+        for column in ("Account Number", "Date", "Amount", "Type"):
+            tree.heading(column, text = column)
+        tree.tag_configure("red", foreground = "red")
+        tree.tag_configure("green", foreground = "green")
+        tree.pack()
+        self.tree = tree
+
+        pager = tk.Frame(self)
+        pager.pack()
+        self.prev_button = tk.Button(pager, text = "< Prev", command = self._prev_page, state = tk.DISABLED)
+        self.prev_button.pack(side = tk.LEFT, padx = 5)
+        self.page_label = tk.Label(pager, text = "")
+        self.page_label.pack(side = tk.LEFT, padx = 5)
+        self.next_button = tk.Button(pager, text = "Next >", command = self._next_page, state = tk.DISABLED)
+        self.next_button.pack(side = tk.LEFT, padx = 5)
+
+    def _read_filters(self):
+        """Validate the filter panel and return the filters, or None after telling the user what is wrong"""
+        filters = {name: entry.get().strip() or None for name, entry in self.entries.items()}
+        for name in ("start_date", "end_date"):
+            if filters[name] and not validate_date(filters[name]):
+                messagebox.showerror("Date Error", "Please enter a valid date in YYYY-MM-DD format.")
+                return None
+        for name in ("min_amount", "max_amount"):
+            if filters[name]:
+                try:
+                    filters[name] = float(filters[name])
+                except ValueError:
+                    messagebox.showerror("Input Error", "Please enter a valid numeric amount.")
+                    return None
+        if filters["account_number"]:
+            try:
+                filters["account_number"] = f"{int(filters['account_number']):09d}"
+            except ValueError:
+                messagebox.showerror("Invalid Input", "Please enter a valid numeric account number.")
+                return None
+        if self.type_var.get() != "All":
+            filters["transaction_type"] = self.type_var.get()
+        return filters
+
+    def _search(self):
+        """Run a new search from the first page"""
+        filters = self._read_filters()
+        if filters is None:
+            return
+        self._load_page(filters, [None])
+
+    def _next_page(self):
+        """Show the page after the current one"""
+        self._load_page(self.filters, self.cursors + [self.next_cursor])
+
+    def _prev_page(self):
+        """Show the page before the current one"""
+        self._load_page(self.filters, self.cursors[:-1])
+
+    def _load_page(self, filters, cursors):
+        """Fetch a page on the worker thread, the current page and its buttons stay as they are until it arrives"""
+        after = cursors[-1]
+        states = {button: button.cget("state") for button in (self.search_button, self.prev_button, self.next_button)}
+        for button in states:
+            button.config(state = tk.DISABLED)
+        self.worker.submit(lambda session: search_transactions(session, after = after, **filters),
+                           lambda result: self._show_page(filters, cursors, result), lambda e: self._search_failed(e, states))
+
+    def _show_page(self, filters, cursors, result):
+        """Show the rows of the page and enable the paging buttons that apply"""
+        if not self.winfo_exists():
+            return
+        self.filters, self.cursors = filters, cursors
+        page, self.next_cursor = result
+        self.tree.delete(*self.tree.get_children())
+        for account_number, date, amount, transaction_type, _ in page:
+            color = "red" if amount < 0 else "green"
+            self.tree.insert("", "end", values = (account_number, date, amount, transaction_type), tags = (color,))
+        self.page_label.config(text = f"Page {len(self.cursors)}" if page else "No transactions found")
+        self.search_button.config(state = tk.NORMAL)
+        self.prev_button.config(state = tk.NORMAL if len(self.cursors) > 1 else tk.DISABLED)
+        self.next_button.config(state = tk.NORMAL if self.next_cursor else tk.DISABLED)
+
+    def _search_failed(self, e, states):
+        """Report the error and put the buttons back as they were, so the user can retry from the page still shown"""
+        logging.error(f"{type(e).__name__}: {repr(e)}")
+        if not self.winfo_exists():
+            return
+        for button, state in states.items():
+            button.config(state = state)
+        messagebox.showerror("Search Error", "The search could not be completed. Please try again, or check the logs.")
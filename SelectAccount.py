@@ -0,0 +1,51 @@
+
+import tkinter as tk
+
+
+class SelectAccountDialog(tk.Toplevel):
+    """Dialog for selecting an account, matching accounts are listed as the number is typed"""
+    def __init__(self, parent, directory, on_select):
+        super().__init__(parent)
+        self.directory = directory
+        self.on_select = on_select
+        self.title("Select Account")
+        self.create_widgets()
+
+    def create_widgets(self):
+        """Create widgets for the dialog"""
+        tk.Label(self, text = "Enter account number:").pack()
+        self.number_var = tk.StringVar()
+        entry = tk.Entry(self, textvariable = self.number_var)
+        entry.pack()
+        entry.focus_set()
+        entry.bind("<Return>", self._submit)
+        entry.bind("<Down>", lambda event: self.matches.focus_set())
+        self.number_var.trace_add("write", self._update_matches)
+
+        self.matches = tk.Listbox(self, width = 30, height = 10)
+        self.matches.pack()
+        self.matches.bind("<Double-Button-1>", self._submit)
+        self.matches.bind("<Return>", self._submit)
+        tk.Button(self, text = "Select", command = self._submit).pack()
+        self._update_matches()
+
+    def _update_matches(self, *args):
+        """Show the accounts whose number starts with what has been typed, answered from the in-memory directory"""
+        self.matches.delete(0, tk.END)
+        prefix = self.number_var.get()
+        if not prefix.strip().isdigit() and prefix.strip():
+            return
+        for account_number, account_type in self.directory.search(prefix):
+            self.matches.insert(tk.END, f"{account_number}  {account_type}")
+        if self.matches.size():
+            self.matches.selection_set(0)
+
+    def _submit(self, event = None):
+        """Select the highlighted account, or the typed number when nothing matches"""
+        selection = self.matches.curselection()
+        if selection:
+            account_number = self.matches.get(selection[0]).split()[0]
+        else:
+            account_number = self.number_var.get().strip()
+        self.destroy()
+        self.on_select(account_number)
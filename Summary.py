@@ -1,27 +1,62 @@
 
+import logging
 import tkinter as tk
-from tkinter import ttk
-from account import Account
+from bisect import bisect
+from tkinter import ttk, messagebox
+from events import ChangeFeed
 
 
 class SummaryDialog(tk.Toplevel):
     """Dialog for displaying account summaries"""
-    def __init__(self, parent, session):
+    def __init__(self, parent, worker, load_rows):
         super().__init__(parent)
-        self.session = session
+        self.worker = worker
+        self.load_rows = load_rows
         self.title("Accounts Summary")
         self.create_widgets()
+        self.feed = ChangeFeed(self, self._apply_changes)
 
     def create_widgets(self):
         """Create widgets for the dialog"""
+        self.loading = tk.Label(self, text = "Loading...")
+        self.loading.pack()
         tree = ttk.Treeview(self, columns = ("Account Number", "Type", "Balance"), show = "headings")
         tree.heading("Account Number", text = "Account Number")
         tree.heading("Type", text = "Type")
         tree.heading("Balance", text = "Balance")
-        
-        accounts = self.session.query(Account).all()
-        for account in accounts:
-            tree.insert("", "end", values = (account.account_number, account.account_type, account.balance))
-        
         tree.pack()
-        tk.Button(self, text="Close", command = self.destroy).pack()
\ No newline at end of file
+        self.tree = tree
+        tk.Button(self, text="Close", command = self.destroy).pack()
+        self.worker.submit(self.load_rows, self._show_rows, self._load_failed)
+
+    def _show_rows(self, rows):
+        """Fill the table once the worker has loaded the accounts"""
+        if not self.winfo_exists():
+            return
+        for row in rows:
+            # Rows refreshed while the summary was loading are newer than the loaded ones
+            if not self.tree.exists(row.account_number):
+                self._upsert(row.account_number, row.account_type, row.balance)
+        self.loading.pack_forget()
+
+    def _upsert(self, account_number, account_type, balance):
+        """Update the row of the account in place, or add it in account number order"""
+        if self.tree.exists(account_number):
+            self.tree.item(account_number, values = (account_number, account_type, balance))
+        else:
+            index = bisect(self.tree.get_children(), account_number)
+            self.tree.insert("", index, iid = account_number, values = (account_number, account_type, balance))
+
+    def _load_failed(self, e):
+        """Report that the accounts could not be loaded"""
+        logging.error(f"{type(e).__name__}: {repr(e)}")
+        if not self.winfo_exists():
+            return
+        self.loading.config(text = "Could not load the accounts.")
+        self.loading.pack(before = self.tree)
+        messagebox.showerror("Error", "The accounts could not be loaded. Please try again, or check the logs.")
+
+    def _apply_changes(self, accounts, transactions):
+        """Refresh only the accounts that were opened or changed since the last refresh"""
+        for _, account_number, account_type, balance in accounts:
+            self._upsert(account_number, account_type, balance)
@@ -0,0 +1,58 @@
+import logging
+import tkinter as tk
+from tkinter import ttk, messagebox
+from events import ChangeFeed
+
+
+class TotalsDialog(tk.Toplevel):
+    """Dialog for displaying the bank-wide totals of every month and account type, kept live as transactions are posted"""
+    def __init__(self, parent, worker, load_totals):
+        super().__init__(parent)
+        self.worker = worker
+        self.load_totals = load_totals
+        self.title("Bank Totals")
+        self.create_widgets()
+        self.feed = ChangeFeed(self, self._apply_changes)
+
+    def create_widgets(self):
+        """Create widgets for the dialog"""
+        self.loading = tk.Label(self, text = "Loading...")
+        self.loading.pack()
+        columns = ("Month", "Type", "Deposits", "Withdrawals", "Interest", "Fees", "Transactions")
+        tree = ttk.Treeview(self, columns = columns, show = "headings")
+        for name in columns:
+            tree.heading(name, text = name)
+            tree.column(name, width = 100, anchor = "w" if name in ("Month", "Type") else "e")
+        tree.pack(fill = tk.BOTH, expand = True)
+        self.tree = tree
+        tk.Button(self, text = "Close", command = self.destroy).pack()
+        self._reload()
+
+    def _reload(self):
+        """Read the totals on the worker thread, they come from the rollups so this stays cheap however many transactions there are"""
+        self.worker.submit(self.load_totals, self._show_totals, self._load_failed)
+
+    def _show_totals(self, rows):
+        """Replace the table with the loaded totals"""
+        if not self.winfo_exists():
+            return
+        self.tree.delete(*self.tree.get_children())
+        for row in rows:
+            self.tree.insert("", tk.END, iid = f"{row.month}|{row.account_type}",
+                             values = (row.month, row.account_type, f"${row.deposits:,.2f}", f"${row.withdrawals:,.2f}",
+                                       f"${row.interest:,.2f}", f"${row.fees:,.2f}", row.transactions))
+        self.loading.pack_forget()
+
+    def _load_failed(self, e):
+        """Report that the totals could not be loaded"""
+        logging.error(f"{type(e).__name__}: {repr(e)}")
+        if not self.winfo_exists():
+            return
+        self.loading.config(text = "Could not load the totals.")
+        self.loading.pack(before = self.tree)
+        messagebox.showerror("Error", "The totals could not be loaded. Please try again, or check the logs.")
+
+    def _apply_changes(self, accounts, transactions):
+        """Reload the totals when transactions were posted since the last refresh"""
+        if transactions:
+            self._reload()
@@ -1,9 +1,10 @@
 from decimal import Decimal, ROUND_HALF_UP
 from datetime import datetime
-from sqlalchemy import Integer, String, ForeignKey, Float, select
+from sqlalchemy import Integer, String, ForeignKey, Float, select, func
 from sqlalchemy.orm import mapped_column, relationship, Session
 from bank import Base
 from transactions import Transaction
+from queries import transaction_history, format_transaction
 
 class Account(Base):
     """The Account Class is used as a parent class for both Checking and Saving Accouts to realize several fundemantal functions
@@ -36,13 +37,10 @@ class Account(Base):
         """
         Generates a unique 9-digit account number.
         """
-        last_account = session.query(Account).order_by(Account.account_id.desc()).first()
-        if last_account:
-            self.account_id = last_account.account_id + 1
-            self.account_number = f"{self.account_id:09d}"  
-        else:
-            self.account_id = 1
-            self.account_number = "000000001" 
+        # A sharded session returns the highest id of every shard, so take the largest of them
+        last_account_id = max(filter(None, session.scalars(select(func.max(Account.account_id)))), default = 0)
+        self.account_id = last_account_id + 1
+        self.account_number = f"{self.account_id:09d}"
         return self.account_number
 
     
@@ -82,18 +80,4 @@ class Account(Base):
 
     def list_transactions(self, session: Session) -> str:
         """Return the transactions from the earliest to latest in the format as required"""
-        history = (
-        session.query(Transaction)
-        .filter(Transaction.account_id == self.account_id)
-        .all()
-        )
-        sorted_history = sorted(history)
-        transations = ""
-        for i in range(len(sorted_history)):
-            t = sorted_history[i]
-            transations += str(t)
-            if i < len(sorted_history) - 1:
-                transations += "\n"
-        return transations
-                
-            
\ No newline at end of file
+        return "\n".join(format_transaction(row) for row in transaction_history(session, self.account_id))
@@ -0,0 +1,87 @@
+import calendar
+from datetime import datetime
+from sqlalchemy import Integer, String, Float, ForeignKey, select, func, case, literal
+from sqlalchemy.orm import mapped_column, Session
+from bank import Base
+from transactions import Transaction
+
+
+class BalanceAccrual(Base):
+    """
+    The BalanceAccrual keeps a running balance-times-days total for the current month of an account, so the average daily balance is
+    known at month end without replaying the month's transactions. balance_days holds the sum of the end-of-day balances of every day
+    of the period before last_date, and balance is the balance on last_date
+    """
+
+    __tablename__ = "balance_accrual"
+
+    account_id = mapped_column(Integer, ForeignKey("account.account_id"), primary_key = True)
+    period = mapped_column(String, nullable = False)
+    last_date = mapped_column(String, nullable = False)
+    balance = mapped_column(Float, nullable = False, default = 0.0)
+    balance_days = mapped_column(Float, nullable = False, default = 0.0)
+
+
+def _period_bounds(date: str):
+    """Return the period (YYYY-MM), its first day and its number of days for a YYYY-MM-DD date"""
+    day = datetime.strptime(date, "%Y-%m-%d")
+    return day.strftime("%Y-%m"), day.replace(day = 1), calendar.monthrange(day.year, day.month)[1]
+
+
+def _days_between(start: str, end) -> int:
+    """Number of days from start to end, end may be a date string or a datetime"""
+    if isinstance(end, str):
+        end = datetime.strptime(end, "%Y-%m-%d")
+    return (end - datetime.strptime(start, "%Y-%m-%d")).days
+
+
+def accrue(session: Session, account, date: str, amount: float) -> None:
+    """
+    Records a posting of amount on date in the accrual of the account. Must be called before the balance of the account is updated.
+    Accounts without an accrual yet, like the ones opened before the accrual existed, start from their balance at the beginning of the month
+    """
+    period, first_day, _ = _period_bounds(date)
+    accrual = session.get(BalanceAccrual, account.account_id)
+    if accrual is None:
+        accrual = BalanceAccrual(account_id = account.account_id, period = period, last_date = first_day.strftime("%Y-%m-%d"),
+                                 balance = float(account.balance or 0.0), balance_days = 0.0)
+        session.add(accrual)
+    elif accrual.period != period:
+        # The balance carried into the new month has been the balance since its first day
+        accrual.balance_days = 0.0
+        accrual.period = period
+        accrual.last_date = first_day.strftime("%Y-%m-%d")
+
+    accrual.balance_days += accrual.balance * _days_between(accrual.last_date, date)
+    accrual.last_date = date
+    accrual.balance += amount
+
+
+def average_daily_balance(session: Session, account, period_end: str) -> float:
+    """
+    Returns the average daily balance of the account for the month ending on period_end, read from the accrual in constant time.
+    If nothing was posted in that month the balance did not change, so the current balance is the average
+    """
+    period, _, days = _period_bounds(period_end)
+    accrual = session.get(BalanceAccrual, account.account_id)
+    if accrual is None or accrual.period != period:
+        return float(account.balance or 0.0)
+    remaining_days = _days_between(accrual.last_date, period_end) + 1
+    return (accrual.balance_days + accrual.balance * remaining_days) / days
+
+
+def recompute_average_daily_balances(session: Session, period_end: str) -> dict:
+    """
+    Recomputes the average daily balance of every account for the month ending on period_end straight from the transactions, for audits.
+    Every transaction counts towards each end-of-day balance from its date to the end of the month, so the whole month is one grouped
+    SQL aggregate instead of a replay: the sum of amount * min(days in month, days until period_end + 1) divided by the days in the month
+    """
+    _, _, days = _period_bounds(period_end)
+    days_held = func.julianday(period_end) - func.julianday(Transaction.date) + 1
+    weight = case((days_held > days, literal(days)), else_ = days_held)
+    stmt = (
+        select(Transaction.account_id, func.sum(Transaction.amount * weight))
+        .where(Transaction.date <= period_end)
+        .group_by(Transaction.account_id)
+    )
+    return {account_id: balance_days / days for account_id, balance_days in session.execute(stmt)}
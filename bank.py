@@ -1,5 +1,5 @@
 import logging
-from sqlalchemy import Integer, String
+from sqlalchemy import Integer, String, select
 from sqlalchemy.orm import relationship, DeclarativeBase, mapped_column, Session
 
 class Base(DeclarativeBase):
@@ -11,6 +11,10 @@ from checking_account import CheckingAccount
 from account import Account
 from datetime import datetime
 from exceptions import OverdrawError, TransactionLimitError, TransactionSequenceError
+from sharding import fan_out
+from queries import account_rows, format_account
+from directory import AccountDirectory
+from rollup import month_totals
 
 class Bank(Base):
     """
@@ -23,6 +27,7 @@ class Bank(Base):
     name = mapped_column(String, default="Bank Service")
     accounts = relationship("Account", back_populates="bank", cascade="all, delete-orphan")
     current_account = None
+    directory = None
 
 
     # def __init__(self):
@@ -42,7 +47,9 @@ Enter command
 4: add transaction
 5: list transactions
 6: interest and fees
-7: quit"""
+7: quit
+8: find account
+9: memory report"""
 
     def open_account(self, session: Session) -> None:
         """
@@ -78,9 +85,14 @@ Enter command
         """
         This function is to provide a summary of accounts the bank is currently having
         """
-        accounts = session.query(Account).all()
-        for account in accounts:
-            print(account.display(session))
+        for row in self.account_rows(session):
+            print(format_account(row))
+
+    def account_rows(self, session: Session) -> list:
+        """
+        This function returns a read-only AccountRow for every account in the bank, ordered by account number
+        """
+        return sorted(fan_out(session, account_rows), key = lambda row: row.account_number)
 
     def select_account(self, session) -> Account:
         """
@@ -100,6 +112,22 @@ Enter command
         self.current_account = account
         return self.current_account
     
+    def find_account(self, session: Session) -> None:
+        """
+        This function lists the accounts whose number starts with the digits the user enters, from an in-memory directory of the accounts
+        that is loaded on the first search
+        """
+        if self.directory is None:
+            self.directory = AccountDirectory()
+            self.directory.load(session)
+        prefix = input("Account number starts with?\n>").strip()
+        matches = self.directory.search(prefix)
+        if not matches:
+            print("No matching accounts.")
+        for account_number, account_type in matches:
+            print(f"{account_type[0].upper() + account_type[1:]}#{account_number}")
+        return None
+
     def add_transaction(self, session: Session) -> None:
         """
         The function is to take the transactions that the user intends the make. The transaction is composed by the amount and date
@@ -190,5 +218,44 @@ Enter command
 
         return None
 
+    def month_end(self, session: Session) -> list:
+        """
+        This function applies the interest and fees to every account that has transactions and returns the account numbers that were
+        charged. Accounts already charged for the month of their latest transaction are skipped
+        """
+        applied = sorted(fan_out(session, _month_end))
+        logging.debug(f"Triggered interest and fees for {len(applied)} accounts")
+        logging.debug("Saved to bank.db")
+        return applied
+
+    def totals(self, session: Session, month: str = None) -> list:
+        """
+        This function returns the deposits, withdrawals, interest paid and fees collected of every month and account type as MonthTotals,
+        or only of the month YYYY-MM. They are read from the rollups kept up to date by every posting, not from the transactions
+        """
+        return month_totals(session, month)
 
 
+def _month_end(session: Session) -> list:
+    """
+    Applies the interest and fees to every account reachable from the session and returns the account numbers that were charged.
+    The accounts are loaded with their subtype columns in one query. Every account commits on its own, so the session does not expire
+    on commit during the run, otherwise each commit would make the next account reload itself; the accounts are expired at the end
+    """
+    applied = []
+    accounts = session.scalars(select(Account)).all()
+    expire_on_commit, session.expire_on_commit = session.expire_on_commit, False
+    try:
+        for account in accounts:
+            if account.latest_transaction_date(session) is None:
+                continue
+            try:
+                account.interests_and_fees(session)
+            except TransactionSequenceError:
+                continue
+            applied.append(account.account_number)
+    finally:
+        session.expire_on_commit = expire_on_commit
+        if expire_on_commit:
+            session.expire_all()
+    return applied
@@ -1,8 +1,9 @@
 import sys
 import logging
-from bank import Bank, Base
-from sqlalchemy import create_engine
-from sqlalchemy.orm.session import sessionmaker, Session
+from bank import Bank
+from database import create_session_factory, persist
+from sessions import SessionScope
+from account import Account
 
 
 logging.basicConfig(
@@ -17,19 +18,21 @@ class Menu:
     This Menu class is used to handle the menu and program running logic for the banking system based on the users' inputs
     """
 
-    def __init__(self, session):
-        """Initializes the notebook. If there is a local save file named notebook.pickle, we load it in.
-        Otherwise, it creates a new notebook
+    def __init__(self, session_factory, policy = None):
+        """Loads the bank from bank.db, or creates it. Every command then runs in its own session scope so that a long-running
+        menu does not keep everything it ever loaded in memory
         """
-        self._session = session
-        self.bank = self._session.get(Bank, 1)
-        if self.bank is None:
-            self.bank = Bank()
-            self._session.add(self.bank)
-            self._session.commit()
-            logging.debug("Saved to bank.db")
-        else:
-            logging.debug("Loaded from bank.db")
+        self._scope = SessionScope(session_factory, policy)
+        self._current_account_id = None
+        with self._scope("load bank") as session:
+            self.bank = session.get(Bank, 1)
+            if self.bank is None:
+                self.bank = Bank()
+                session.add(self.bank)
+                session.commit()
+                logging.debug("Saved to bank.db")
+            else:
+                logging.debug("Loaded from bank.db")
         
     
     def run(self):
@@ -37,47 +40,66 @@ class Menu:
         Main running logic function to show the menu, get the input from users, take actions based on the input
         """
         while True:
-            print(self.bank.menu(self._session))
+            with self._scope("menu") as session:
+                self._attach_current_account(session)
+                print(self.bank.menu(session))
             command = input(">").strip()
                 
-            if command == "1":
-                self.bank.open_account(self._session) 
-            elif command == "2":
-                self.bank.summary(self._session)
-            elif command == "3":
-                self.bank.select_account(self._session)
-            elif command == "4":
-                self.bank.add_transaction(self._session) 
-            elif command == "5":
-                self.bank.list_transactions(self._session)
-            elif command == "6":
-                self.bank.interests_and_fees(self._session) 
-            elif command == "7":
-                self._quit()
-            else:
-                raise EOFError("EOF when reading a line")
+            with self._scope(f"command {command}") as session:
+                self._attach_current_account(session)
+                if command == "1":
+                    self.bank.open_account(session) 
+                elif command == "2":
+                    self.bank.summary(session)
+                elif command == "3":
+                    self.bank.select_account(session)
+                elif command == "4":
+                    self.bank.add_transaction(session) 
+                elif command == "5":
+                    self.bank.list_transactions(session)
+                elif command == "6":
+                    self.bank.interests_and_fees(session) 
+                elif command == "7":
+                    self._quit(session)
+                elif command == "8":
+                    self.bank.find_account(session)
+                elif command == "9":
+                    print(self._scope.report())
+                else:
+                    raise EOFError("EOF when reading a line")
+                current_account = self.bank.current_account
+                self._current_account_id = current_account.account_id if current_account else None
+
+
+    def _attach_current_account(self, session):
+        """
+        The selected account is remembered by its id between commands and loaded again in the session of each command
+        """
+        self.bank.current_account = session.get(Account, self._current_account_id) if self._current_account_id else None
 
 
-    def _quit(self):
+    def _quit(self, session):
         """
         Saves the state and exits the program
         """
         try:
-            self._session.commit()
+            session.commit()
         except Exception as e:
             logging.error(f"Commit error: {repr(e)}")
         finally:
-            self._session.close()
+            session.close()
+            self._scope.close()
+        logging.debug(self._scope.report())
+        for report in persist():
+            print(report)
         sys.exit(0)
 
 
 if __name__ == "__main__":
     try:
-        engine = create_engine("sqlite:///bank.db")
-        Base.metadata.create_all(engine)
-        Session = sessionmaker(bind=engine)
-        session = Session()
-        Menu(session).run()
+        # --memory runs the bank in memory and writes it back to bank.db periodically and on quit
+        Session = create_session_factory(memory = True if "--memory" in sys.argv[1:] else None)
+        Menu(Session).run()
     
     except EOFError as e:
         logging.error(f"{type(e).__name__}: '{str(e)}'")
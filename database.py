@@ -0,0 +1,185 @@
+import os
+import re
+import time
+import atexit
+import logging
+import sqlite3
+import threading
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import sessionmaker
+from bank import Base
+from sharding import ShardRouter
+from exceptions import ShardCountError
+
+DATABASE_PATH = "bank.db"
+FLUSH_INTERVAL = 30
+
+_memory_databases = []
+
+
+class MemoryDatabase:
+    """
+    The MemoryDatabase runs a database file as an in-memory SQLite copy, loaded with the SQLite backup API at startup and written back
+    every flush_interval seconds and on quit. Postings no longer wait for the disk, at the price of losing the commits made since the last
+    flush if the process dies. The copy uses a shared cache so that the flusher reads through its own connection, which only ever sees
+    committed transactions
+    """
+
+    def __init__(self, path: str, flush_interval: float = FLUSH_INTERVAL):
+        """Load the database file into memory and start flushing it back in the background"""
+        self.path = path
+        self.flush_interval = flush_interval
+        self.flushes = 0
+        self.commits_since_flush = 0
+        self.last_flush = time.monotonic()
+        self._lock = threading.Lock()
+        self._stopped = threading.Event()
+
+        uri = f"file:bank_memory_{len(_memory_databases)}?mode=memory&cache=shared"
+        # The database lives as long as one connection to it is open, this one is also the one the flushes read from
+        self._connection = sqlite3.connect(uri, uri = True, check_same_thread = False)
+        disk = sqlite3.connect(path)
+        try:
+            disk.backup(self._connection)
+        finally:
+            disk.close()
+        logging.debug(f"Loaded {path} into memory")
+
+        self.engine = create_engine(f"sqlite:///{uri}&uri=true")
+        event.listen(self.engine, "commit", self._count_commit)
+        self._thread = threading.Thread(target = self._flush_periodically, name = f"flush-{path}", daemon = True)
+        self._thread.start()
+
+    def _count_commit(self, connection) -> None:
+        """Count the commits that are not on disk yet"""
+        self.commits_since_flush += 1
+
+    def _flush_periodically(self) -> None:
+        """Flusher thread loop"""
+        while not self._stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logging.error(f"Flush error: {repr(e)}")
+
+    def flush(self) -> None:
+        """Write the committed state of the in-memory database back to its file"""
+        with self._lock:
+            pending = self.commits_since_flush
+            disk = sqlite3.connect(self.path)
+            try:
+                # Pages locked by a running transaction are retried until it commits
+                self._connection.backup(disk, sleep = 0.01)
+            finally:
+                disk.close()
+            self.commits_since_flush -= pending
+            self.flushes += 1
+            self.last_flush = time.monotonic()
+        logging.debug(f"Flushed {pending} commits to {self.path}")
+
+    def report(self) -> str:
+        """Describe how often the database was flushed and what would be lost if the process died now"""
+        return (f"{self.path}: flushed {self.flushes} times, every {self.flush_interval:g}s; {self.commits_since_flush} commits from the last "
+                f"{time.monotonic() - self.last_flush:.0f}s are not on disk yet")
+
+    def close(self) -> None:
+        """Stop the flusher and write everything back"""
+        if self._stopped.is_set():
+            return
+        self._stopped.set()
+        self._thread.join()
+        self.flush()
+
+
+def shard_paths(count: int) -> list:
+    """Return the SQLite files used for the given number of shards"""
+    if count <= 1:
+        return [DATABASE_PATH]
+    return [f"bank_{i}.db" for i in range(count)]
+
+
+def create_session_factory(shards: int = None, memory: bool = None) -> sessionmaker:
+    """
+    Creates the database tables if needed and returns the session factory used by the CLI and the GUI. The number of shards is read
+    from the BANK_SHARDS environment variable unless given; with a single shard everything lives in bank.db as before. The shard count
+    must stay the same for the lifetime of a database because accounts are routed by their account id, so it is stored in every file
+    and a different count raises ShardCountError. With memory, or BANK_MEMORY=1,
+    every database file runs as a MemoryDatabase and persist() must be called before quitting
+    """
+    if shards is None:
+        shards = int(os.environ.get("BANK_SHARDS", "1"))
+    if memory is None:
+        memory = os.environ.get("BANK_MEMORY", "0") == "1"
+    check_shard_count(shards)
+    engines = []
+    for path in shard_paths(shards):
+        if memory:
+            database = MemoryDatabase(path)
+            _memory_databases.append(database)
+            engine = database.engine
+        else:
+            engine = create_engine(f"sqlite:///{path}")
+        create_schema(engine)
+        _stamp_shard_count(engine, shards)
+        engines.append(engine)
+
+    if len(engines) == 1:
+        return sessionmaker(bind = engines[0])
+    return ShardRouter(engines).sessionmaker()
+
+
+def check_shard_count(shards: int) -> None:
+    """
+    Raises ShardCountError if a database file in the working directory was created with another shard count. The files of the other
+    layout count too: opening 3 shards next to a single-shard bank.db would start an empty bank instead of reading it
+    """
+    paths = shard_paths(shards)
+    existing = [path for path in os.listdir(".") if path == DATABASE_PATH or re.fullmatch(r"bank_\d+\.db", path)]
+    for path in sorted(existing):
+        stored = _stored_shard_count(path)
+        # Files created before the count was stored hold 0 and are stamped when they are opened
+        if stored and (stored != shards or path not in paths):
+            raise ShardCountError(path, stored, shards)
+
+
+def _stored_shard_count(path: str) -> int:
+    """The shard count stored in the user_version of a database file"""
+    connection = sqlite3.connect(path)
+    try:
+        return connection.execute("PRAGMA user_version").fetchone()[0]
+    finally:
+        connection.close()
+
+
+def _stamp_shard_count(engine, shards: int) -> None:
+    """Store the shard count in the user_version of a shard that does not have it yet"""
+    with engine.begin() as connection:
+        if not connection.exec_driver_sql("PRAGMA user_version").scalar():
+            connection.exec_driver_sql(f"PRAGMA user_version = {int(shards)}")
+
+
+def create_schema(engine) -> None:
+    """Create the missing tables, and the missing indexes of tables created by an older version which create_all leaves alone"""
+    Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(engine, checkfirst = True)
+
+
+def persist() -> list:
+    """Flush every in-memory database back to its file and return their reports, does nothing for databases on disk"""
+    reports = []
+    for database in _memory_databases:
+        database.close()
+        reports.append(database.report())
+        logging.debug(database.report())
+    return reports
+
+
+def memory_report() -> str:
+    """Describe the state of the in-memory databases, empty when the databases are on disk"""
+    return "; ".join(database.report() for database in _memory_databases)
+
+
+# A normal interpreter exit still saves the in-memory databases if the application did not
+atexit.register(persist)
@@ -0,0 +1,79 @@
+import threading
+from bisect import bisect_left
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from queries import account_table
+from sharding import fan_out
+import events
+
+
+class AccountDirectory:
+    """
+    The AccountDirectory keeps every account number and account type in memory, in number order, so that type-ahead lookups are a
+    binary search instead of a query per keystroke. Numbers are indexed without their leading zeros, the way users type them. The
+    directory is loaded once and then follows the accounts opened through any session of this process
+    """
+
+    def __init__(self):
+        self._keys = []
+        self._accounts = []
+        self._lock = threading.Lock()
+        self.loaded = False
+
+    def load(self, session: Session) -> None:
+        """Read every account once and start following new accounts"""
+        a = account_table().c
+        stmt = select(a.account_number, a.account_type).execution_options(yield_per = 10000)
+        accounts = sorted(fan_out(session, lambda shard_session: shard_session.execute(stmt).tuples()), key = lambda account: _key(account[0]))
+        with self._lock:
+            self._accounts = accounts
+            self._keys = [_key(account_number) for account_number, _ in accounts]
+        if not self.loaded:
+            events.subscribe(self._apply_changes)
+            self.loaded = True
+
+    def add(self, account_number: str, account_type: str) -> None:
+        """Add an account, or update its type if it is already known"""
+        key = _key(account_number)
+        with self._lock:
+            # Keys sort in number order and new account numbers are the largest so far, which makes this an append in practice
+            index = bisect_left(self._keys, key)
+            if index < len(self._keys) and self._keys[index] == key:
+                self._accounts[index] = (account_number, account_type)
+            else:
+                self._keys.insert(index, key)
+                self._accounts.insert(index, (account_number, account_type))
+
+    def search(self, prefix: str, limit: int = 20) -> list:
+        """Return up to limit (account_number, account_type) whose number starts with the typed prefix, in number order"""
+        digits = prefix.strip().lstrip("0")
+        results = []
+        with self._lock:
+            longest = self._keys[-1][0] if self._keys else 0
+            # Shorter numbers come first, so the matches of each length are a contiguous run found with one binary search
+            for length in range(len(digits), longest + 1):
+                index = bisect_left(self._keys, (length, digits))
+                while index < len(self._keys) and len(results) < limit and self._keys[index][0] == length \
+                        and self._keys[index][1].startswith(digits):
+                    results.append(self._accounts[index])
+                    index += 1
+                if len(results) == limit:
+                    break
+        return results
+
+    def __len__(self) -> int:
+        return len(self._keys)
+
+    def _apply_changes(self, accounts, transactions) -> None:
+        """Follow the accounts opened by every committed session"""
+        for _, account_number, account_type, _ in accounts:
+            self.add(account_number, account_type)
+
+
+def _key(account_number: str) -> tuple:
+    """
+    Account numbers are indexed without their leading zeros, the way users type them, and by length first so that the keys sort in
+    number order rather than as strings, where 10 would come before 2
+    """
+    digits = account_number.lstrip("0")
+    return len(digits), digits
@@ -0,0 +1,116 @@
+import queue
+import logging
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from account import Account
+from transactions import Transaction
+
+_subscribers = []
+_lock = threading.Lock()
+
+
+def subscribe(callback) -> None:
+    """
+    Register callback(accounts, transactions) to be called after every commit that opened an account, changed a balance or posted a
+    transaction. accounts holds (account_id, account_number, account_type, balance) and transactions holds
+    (account_id, transaction_id, date, amount, transaction_type). The callback runs on the thread that committed
+    """
+    with _lock:
+        _subscribers.append(callback)
+
+
+def unsubscribe(callback) -> None:
+    """Stop sending changes to the callback"""
+    with _lock:
+        if callback in _subscribers:
+            _subscribers.remove(callback)
+
+
+@event.listens_for(Session, "after_flush")
+def _collect_changes(session, flush_context):
+    """Remember what the flush wrote, the objects are expired by the time the commit finishes"""
+    accounts = session.info.setdefault("changed_accounts", {})
+    transactions = session.info.setdefault("posted_transactions", [])
+    for obj in session.new:
+        if isinstance(obj, Transaction):
+            transactions.append((obj.account_id, obj.transaction_id, obj.date, obj.amount, obj.transaction_type))
+    for obj in list(session.new) + list(session.dirty):
+        if isinstance(obj, Account):
+            accounts[obj.account_id] = (obj.account_id, obj.account_number, obj.account_type, obj.balance)
+
+
+@event.listens_for(Session, "after_commit")
+def _publish_changes(session):
+    """Send the committed changes to the subscribers"""
+    accounts = session.info.pop("changed_accounts", {})
+    transactions = session.info.pop("posted_transactions", [])
+    if not accounts and not transactions:
+        return
+    with _lock:
+        subscribers = list(_subscribers)
+    for callback in subscribers:
+        try:
+            callback(list(accounts.values()), transactions)
+        except Exception as e:
+            logging.error(f"{type(e).__name__}: {repr(e)}")
+
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changes(session):
+    """Nothing that was rolled back is announced"""
+    session.info.pop("changed_accounts", None)
+    session.info.pop("posted_transactions", None)
+
+
+class ChangeFeed:
+    """
+    The ChangeFeed hands the committed changes to a Tk widget. Changes are queued by whichever thread committed them and delivered on
+    the main thread every INTERVAL_MS, merged into one batch, so a busy bank causes one small update per interval instead of one per commit
+    """
+
+    INTERVAL_MS = 250
+
+    def __init__(self, widget, on_changes):
+        """Start delivering on_changes(accounts, transactions) to the widget until close() is called or the widget is destroyed"""
+        self.widget = widget
+        self.on_changes = on_changes
+        self._queue = queue.Queue()
+        subscribe(self._enqueue)
+        self._job = self.widget.after(self.INTERVAL_MS, self._deliver)
+        self.widget.bind("<Destroy>", self._on_destroy, add = "+")
+
+    def _enqueue(self, accounts, transactions) -> None:
+        """Called on the committing thread"""
+        self._queue.put((accounts, transactions))
+
+    def _deliver(self) -> None:
+        """Merge everything queued since the last interval and deliver it on the main thread"""
+        accounts = {}
+        transactions = []
+        while True:
+            try:
+                changed_accounts, posted_transactions = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            for account in changed_accounts:
+                accounts[account[0]] = account
+            transactions.extend(posted_transactions)
+        if accounts or transactions:
+            self.on_changes(list(accounts.values()), transactions)
+        # on_changes may have closed the feed
+        if self._job is not None:
+            self._job = self.widget.after(self.INTERVAL_MS, self._deliver)
+
+    def _on_destroy(self, event) -> None:
+        """The Destroy events of the children reach the widget's binding too, only the widget itself closes the feed"""
+        if event.widget is self.widget:
+            self.close()
+
+    def close(self) -> None:
+        """Stop delivering changes"""
+        if self._job is None:
+            return
+        unsubscribe(self._enqueue)
+        self.widget.after_cancel(self._job)
+        self._job = None
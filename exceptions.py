@@ -16,3 +16,11 @@ class TransactionLimitError(ValueError):
         self.limit_value = limit_value
         super().__init__(f"This transaction could not be completed because this account already has {limit_value} transactions in this {limit_type}.")
 
+
+class ShardCountError(ValueError):
+    """Exception raised when the database files were created with a different number of shards than requested"""
+    def __init__(self, path: str, stored: int, requested: int):
+        self.path = path
+        self.stored = stored
+        self.requested = requested
+        super().__init__(f"{path} belongs to a bank with {stored} shard(s) but {requested} were requested. Accounts are routed by the shard count, so it cannot change; set BANK_SHARDS={stored}.")
@@ -1,16 +1,21 @@
 import sys
 import tkinter as tk
-from tkinter import messagebox, simpledialog, ttk
-from sqlalchemy import create_engine
-from sqlalchemy.orm import sessionmaker
-from bank import Bank, Base
+from tkinter import messagebox
+from bank import Bank
+from database import create_session_factory, persist, memory_report
 import logging
-from transactions import Transaction
 from exceptions import TransactionSequenceError
 from account import Account
 from OpenAccount import OpenAccountDialog
 from Summary import SummaryDialog
+from History import HistoryDialog
 from AddTransaction import AddTransactionDialog
+from SearchTransactions import SearchTransactionsDialog
+from Totals import TotalsDialog
+from worker import DBWorker
+from queries import find_account
+from directory import AccountDirectory
+from SelectAccount import SelectAccountDialog
 
 # Configure logging
 logging.basicConfig(
@@ -27,11 +32,8 @@ def handle_exception(exception, value, traceback):
     messagebox.showerror("Unexpected Error", error_message)
     sys.exit(0)
 
-# Database setup
-engine = create_engine("sqlite:///bank.db")
-Base.metadata.create_all(engine)
-Session = sessionmaker(bind = engine)
-session = Session()
+# Database setup, --memory runs the bank in memory and writes it back to bank.db periodically and on quit
+Session = create_session_factory(memory = True if "--memory" in sys.argv[1:] else None)
 
 
 class BankGUI:
@@ -40,6 +42,16 @@ class BankGUI:
         """Initialize the GUI components and set up the main window"""
         self.root = root
         self.root.title("MY BANK")
+        self.bank = None
+        self.selected_account_id = None
+        self.create_widgets()
+        self.worker = DBWorker(self.root, Session, on_busy = self._set_busy)
+        self.worker.submit(self._load_bank)
+        self.directory = AccountDirectory()
+        self.worker.submit(self.directory.load, on_error = self._directory_failed)
+
+    def _load_bank(self, session):
+        """Load the bank from the database or create it, runs on the worker thread"""
         self.bank = session.get(Bank, 1)
         if self.bank is None:
             self.bank = Bank()
@@ -48,8 +60,6 @@ class BankGUI:
             logging.debug("Saved to bank.db")
         else:
             logging.debug("Loaded from bank.db")
-        self.selected_account = None
-        self.create_widgets()
 
     def create_widgets(self):
         """Create interactive buttons on the main window"""
@@ -64,23 +74,44 @@ class BankGUI:
             ("List Transactions", self._list_transactions),
             ("Add Transaction", self._add_transaction),
             ("Interest and Fees", self._apply_interest_fees),
+            ("Search", self._search_transactions),
+            ("Totals", self._show_totals),
             ("Quit", self._quit_app)
         ]
         for text, command in buttons:
             btn = tk.Button(self.frame, text = text, command = command, width = 15)
             btn.pack(side = tk.LEFT, padx = 5, pady = 5)
+        self.status = tk.Label(self.root, text = "", anchor = "w")
+        self.status.pack(fill = tk.X)
+
+    def _directory_failed(self, e):
+        """Report that the account list for the type-ahead could not be loaded"""
+        logging.error(f"{type(e).__name__}: {repr(e)}")
+        messagebox.showerror("Error", "The account list could not be loaded, accounts can still be selected by their full number. Check logs.")
+
+    def _set_busy(self, busy):
+        """Show a busy cursor and status while the worker is running database operations"""
+        self.root.config(cursor = "watch" if busy else "")
+        self.status.config(text = "Working..." if busy else memory_report())
 
     def _open_account(self):
         """Open the Account Creation Dialog"""
-        OpenAccountDialog(self.root, session)
+        OpenAccountDialog(self.root, self.worker)
 
     def _show_summary(self):
         """Open the Account Summary Dialog"""
-        SummaryDialog(self.root, session)
+        SummaryDialog(self.root, self.worker, lambda session: self.bank.account_rows(session))
+
+    def _show_totals(self):
+        """Open the Bank Totals Dialog"""
+        TotalsDialog(self.root, self.worker, lambda session: self.bank.totals(session))
 
     def _select_account(self):
         """Allow users to select an account"""
-        account_number = simpledialog.askstring("Select Account", "Enter account number:")
+        SelectAccountDialog(self.root, self.directory, self._lookup_account)
+
+    def _lookup_account(self, account_number):
+        """Look up the account chosen in the Select Account Dialog"""
         if account_number:
             try:
                 account_number = int(account_number)
@@ -88,71 +119,84 @@ class BankGUI:
                 messagebox.showerror("Invalid Input", "Please enter a valid numeric account number.")
                 return
             account_number = f"{account_number:09d}"
-            account = session.query(Account).filter_by(account_number = account_number).first()
-            self.selected_account = account
-            if self.selected_account:
-                self.header.config(text=f"Selected account: {self.selected_account.account_type}{self.selected_account.account_number}")
-                messagebox.showinfo("Success", "Account selected!")
-            else:
-                messagebox.showerror("Error", "Account not found!")
+            self.worker.submit(lambda session: find_account(session, account_number), self._account_selected, self._lookup_failed)
+
+    def _lookup_failed(self, e):
+        """Report that the account could not be looked up, the selection stays as it was"""
+        logging.error(f"{type(e).__name__}: {repr(e)}")
+        messagebox.showerror("Error", "The account could not be looked up. Please try again, or check the logs.")
+
+    def _account_selected(self, account):
+        """Update the selected account once it has been looked up"""
+        if account:
+            self.selected_account_id = account.account_id
+            self.header.config(text=f"Selected account: {account.account_type}{account.account_number}")
+            messagebox.showinfo("Success", "Account selected!")
+        else:
+            self.selected_account_id = None
+            self.header.config(text = "Selected account:")
+            messagebox.showerror("Error", "Account not found!")
 
     def _list_transactions(self):
         """List all transactions for the selected account"""
-        if not self.selected_account:
+        if not self.selected_account_id:
             messagebox.showerror("Error", "This command requires that you first select an account.")
             return
-        history = (
-            session.query(Transaction)
-            .filter(Transaction.account_id == self.selected_account.account_id)
-            .all()
-        )
-        sorted_history = sorted(history)
-        self._display_transactions(sorted_history)
-
-    def _display_transactions(self, transactions):
-        """Display transactions"""
-        top = tk.Toplevel(self.root)
-        top.title("Transaction History")
-        tree = ttk.Treeview(top, columns = ("Date", "Amount"), show = "headings")
-        tree.heading("Date", text = "Date")
-        tree.heading("Amount", text = "Amount")
-        
-        for transaction in transactions:
-            color = "red" if transaction.amount < 0 else "green"
-            tree.insert("", "end", values = (transaction.date, transaction.amount), tags = (color,))
-        
-        tree.tag_configure("red", foreground = "red")
-        tree.tag_configure("green", foreground = "green")
-        tree.pack()
+        HistoryDialog(self.root, self.worker, self.selected_account_id)
 
     def _add_transaction(self):
         """Open the Transaction Addition Dialog"""
-        if not self.selected_account:
+        if not self.selected_account_id:
             messagebox.showerror("Error", "This command requires that you first select an account.")
             return
-        AddTransactionDialog(self.root, session, self.selected_account)
+        AddTransactionDialog(self.root, self.worker, self.selected_account_id)
 
     def _apply_interest_fees(self):
         """Apply interest and fees to the selected account"""
-        if not self.selected_account:
+        if not self.selected_account_id:
             messagebox.showerror("Error", "This command requires that you first select an account.")
             return
-        try:
-            self.selected_account.interests_and_fees(session)
-            messagebox.showinfo("Success", "Interest and fees applied!")
-            logging.debug("Triggered interest and fees")
-            logging.debug("Saved to bank.db")
-        except TransactionSequenceError as e:
+        account_id = self.selected_account_id
+        self.worker.submit(lambda session: _interests_and_fees(session, account_id), self._interest_fees_applied, self._interest_fees_failed)
+
+    def _interest_fees_applied(self, applied):
+        """Report that the interest and fees were applied"""
+        if not applied:
+            messagebox.showerror("Error", "This account has no transactions yet, there is no month to apply interest and fees to.")
+            return
+        messagebox.showinfo("Success", "Interest and fees applied!")
+        logging.debug("Triggered interest and fees")
+        logging.debug("Saved to bank.db")
+
+    def _interest_fees_failed(self, e):
+        """Report why the interest and fees could not be applied"""
+        if isinstance(e, TransactionSequenceError):
             messagebox.showerror("Error", f"Cannot apply interest and fees again in the month of {e.latest_transaction_date}.")
+        else:
+            logging.error(f"{type(e).__name__}: {repr(e)}")
+            messagebox.showerror("Error", "An unexpected error occurred. Check logs.")
+
+    def _search_transactions(self):
+        """Open the Transaction Search Dialog"""
+        SearchTransactionsDialog(self.root, self.worker)
 
     def _quit_app(self):
         """Quit the application"""
-        session.commit()
-        session.close()
+        self.worker.stop()
+        persist()
         logging.info("Application closed.")
         self.root.quit()
 
 
+def _interests_and_fees(session, account_id):
+    """Apply the interest and fees of the account on the worker thread, returns False if the account has no transactions yet"""
+    account = session.get(Account, account_id)
+    if account.latest_transaction_date(session) is None:
+        return False
+    account.interests_and_fees(session)
+    return True
+
+
 if __name__ == "__main__":
     root = tk.Tk()
     root.report_callback_exception = handle_exception
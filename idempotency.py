@@ -0,0 +1,74 @@
+import hashlib
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import Integer, String, ForeignKey, LargeBinary, delete
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import mapped_column, Session
+from bank import Base
+from sharding import fan_out
+
+# Clients retry within minutes, a feed replays at most the last few days
+RETENTION_DAYS = 30
+
+
+class PostingKey(Base):
+    """
+    The PostingKey remembers the idempotency key of a posting together with the transaction it created, so a retried posting is
+    recognised with a single primary-key probe instead of a scan of the ledger. Keys are scoped to their account and stored as the
+    32-byte SHA-256 digest of the client's key, whatever its length, in a table clustered on its primary key
+    """
+
+    __tablename__ = "posting_keys"
+
+    account_id = mapped_column(Integer, ForeignKey("account.account_id"), primary_key = True)
+    key_hash = mapped_column(LargeBinary(32), primary_key = True)
+    transaction_id = mapped_column(Integer, nullable = False)
+    created_at = mapped_column(String, nullable = False)
+
+    # The primary key is the only index the lookups need, so skip the rowid and its separate b-tree
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+def hash_key(idempotency_key: str) -> bytes:
+    """Return the digest stored for an idempotency key"""
+    return hashlib.sha256(idempotency_key.encode("utf-8")).digest()
+
+
+def find_posting(session: Session, account_id: int, idempotency_key: str):
+    """Return the PostingKey recorded for the key on the account, or None if nothing was posted with it"""
+    return session.get(PostingKey, (account_id, hash_key(idempotency_key)))
+
+
+def record_posting(session: Session, account_id: int, idempotency_key: str, transaction_id: int) -> None:
+    """Record the key of a posting in the same database transaction as the posting itself"""
+    session.add(PostingKey(account_id = account_id, key_hash = hash_key(idempotency_key), transaction_id = transaction_id,
+                           created_at = datetime.now().strftime("%Y-%m-%d %H:%M:%S")))
+
+
+def commit_posting(session: Session, account_id: int, idempotency_key: str = None) -> None:
+    """
+    Commits a posting. If a concurrent retry with the same key committed first, the primary key rejects this one: it is rolled back and
+    treated as the duplicate it is
+    """
+    try:
+        session.commit()
+    except IntegrityError:
+        session.rollback()
+        if idempotency_key is None or find_posting(session, account_id, idempotency_key) is None:
+            raise
+        logging.debug(f"Ignored concurrent duplicate posting on account {account_id}")
+
+
+def purge_posting_keys(session: Session, retention_days: int = RETENTION_DAYS) -> int:
+    """Delete the keys older than the retention window on every shard and return how many were deleted"""
+    cutoff = (datetime.now() - timedelta(days = retention_days)).strftime("%Y-%m-%d %H:%M:%S")
+    purged = sum(fan_out(session, lambda shard: [_purge(shard, cutoff)]))
+    logging.debug(f"Purged {purged} posting keys older than {cutoff}")
+    return purged
+
+
+def _purge(session: Session, cutoff: str) -> int:
+    """Purge one shard"""
+    result = session.execute(delete(PostingKey).where(PostingKey.created_at < cutoff))
+    session.commit()
+    return result.rowcount
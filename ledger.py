@@ -0,0 +1,143 @@
+import argparse
+import logging
+from sqlalchemy import select, update, func
+from sqlalchemy.orm import Session
+from database import create_session_factory
+from sharding import fan_out
+from account import Account
+from transactions import Transaction
+from accrual import BalanceAccrual, average_daily_balance, recompute_average_daily_balances
+from idempotency import RETENTION_DAYS, purge_posting_keys
+from rollup import rebuild_rollups
+from utils import get_last_day_of_month
+
+
+logging.basicConfig(
+    filename = "bank.log",
+    level = logging.DEBUG,
+    format = "%(asctime)s|%(levelname)s|%(message)s",
+    datefmt = "%Y-%m-%d %H:%M:%S"
+)
+
+# Balances are stored as floats, so anything below half a cent is rounding noise rather than drift
+DRIFT_TOLERANCE = 0.005
+BATCH_SIZE = 10000
+
+
+def replay_ledger(session: Session, batch_size: int = BATCH_SIZE):
+    """
+    Replays the whole ledger in a single pass and yields (account_id, account_number, stored balance, ledger balance) for every account.
+    The transaction amounts are grouped by account_id inside SQLite, so only one row per account ever reaches Python and the rows are
+    streamed in batches to keep the memory bounded no matter how many transactions there are
+    """
+    totals = (
+        select(Transaction.account_id, func.sum(Transaction.amount).label("total"))
+        .group_by(Transaction.account_id)
+        .subquery()
+    )
+    stmt = (
+        select(Account.account_id, Account.account_number, Account.balance, func.coalesce(totals.c.total, 0.0))
+        .outerjoin(totals, totals.c.account_id == Account.account_id)
+        .order_by(Account.account_id)
+        .execution_options(yield_per = batch_size)
+    )
+    for account_id, account_number, balance, ledger_balance in session.execute(stmt):
+        yield account_id, account_number, balance or 0.0, ledger_balance
+
+
+def verify_balances(session: Session, tolerance: float = DRIFT_TOLERANCE, batch_size: int = BATCH_SIZE):
+    """Yields (account_id, account_number, stored balance, ledger balance) for the accounts whose balance does not match their transactions"""
+    for account_id, account_number, balance, ledger_balance in replay_ledger(session, batch_size):
+        if abs(balance - ledger_balance) > tolerance:
+            yield account_id, account_number, balance, ledger_balance
+
+
+def rebuild_balances(session: Session, tolerance: float = DRIFT_TOLERANCE, batch_size: int = BATCH_SIZE) -> int:
+    """
+    Resets the balance of every drifted account to the sum of its transactions and returns how many accounts were fixed.
+    Bulk updates by primary key cannot be routed by a sharded session, so every shard rebuilds its own accounts
+    """
+    fixed = sum(fan_out(session, lambda shard: [_rebuild_shard(shard, tolerance, batch_size)]))
+    logging.debug(f"Rebuilt {fixed} account balances")
+    logging.debug("Saved to bank.db")
+    return fixed
+
+
+def _rebuild_shard(session: Session, tolerance: float, batch_size: int) -> int:
+    """
+    Rebuilds the drifted balances of one shard. The ledger is fully read before writing so the updates never run under an open cursor;
+    only the drifted accounts are kept in memory
+    """
+    fixes = [{"account_id": account_id, "balance": ledger_balance}
+             for account_id, _, _, ledger_balance in verify_balances(session, tolerance, batch_size)]
+    for start in range(0, len(fixes), batch_size):
+        session.execute(update(Account), fixes[start:start + batch_size])
+    session.commit()
+    return len(fixes)
+
+
+def report(session: Session) -> int:
+    """Prints every drifted account and returns the number of drifted accounts"""
+    checked = 0
+    drifted = 0
+    for account_id, account_number, balance, ledger_balance in replay_ledger(session):
+        checked += 1
+        if abs(balance - ledger_balance) > DRIFT_TOLERANCE:
+            drifted += 1
+            print(f"#{account_number},\tstored: ${balance:,.2f},\tledger: ${ledger_balance:,.2f},\tdrift: ${balance - ledger_balance:,.2f}")
+    print(f"Checked {checked} accounts, {drifted} drifted.")
+    logging.debug(f"Verified ledger: {checked} accounts, {drifted} drifted")
+    return drifted
+
+
+def audit_accruals(session: Session, period: str, tolerance: float = DRIFT_TOLERANCE) -> int:
+    """
+    Compares the average daily balance kept by the accrual engine with the one recomputed from the transactions for the month
+    YYYY-MM, prints the accounts that disagree and returns how many there are. An accrual only covers the current month of its account,
+    so accounts that have postings in a later month are not compared. The numbers of compared and skipped accounts are printed, with a
+    warning when nothing was compared
+    """
+    period_end = get_last_day_of_month(f"{period}-01")
+    recomputed = recompute_average_daily_balances(session, period_end)
+    checked = 0
+    mismatched = 0
+    # Load every account with its accrual in one query instead of one get() per accrual
+    stmt = (
+        select(BalanceAccrual, Account)
+        .join(Account, Account.account_id == BalanceAccrual.account_id)
+        .where(BalanceAccrual.period == period)
+    )
+    for accrual, account in session.execute(stmt):
+        checked += 1
+        accrued = average_daily_balance(session, account, period_end)
+        expected = recomputed.get(accrual.account_id, 0.0)
+        if abs(accrued - expected) > tolerance:
+            mismatched += 1
+            print(f"#{account.account_number},\taccrued: ${accrued:,.2f},\trecomputed: ${expected:,.2f}")
+    moved_on = sum(session.scalars(select(func.count()).select_from(BalanceAccrual).where(BalanceAccrual.period > period)))
+    print(f"Audited the average daily balances of {period}: {checked} accounts compared, {mismatched} mismatched.")
+    if moved_on:
+        print(f"{moved_on} accounts have postings in a later month and were not compared, accruals only keep the current month of each account.")
+    if not checked:
+        print(f"Warning: no account has its accrual in {period}, so nothing was audited.")
+    logging.debug(f"Audited accruals of {period}: {checked} compared, {mismatched} mismatched")
+    return mismatched
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Verify the account balances against the ledger")
+    parser.add_argument("--rebuild", action = "store_true", help = "reset drifted balances to the sum of their transactions")
+    parser.add_argument("--accruals", metavar = "YYYY-MM", help = "also audit the average daily balances of the month")
+    parser.add_argument("--rollups", action = "store_true", help = "rebuild the monthly totals from the transactions")
+    parser.add_argument("--purge-keys", action = "store_true", help = f"delete posting idempotency keys older than {RETENTION_DAYS} days")
+    args = parser.parse_args()
+    with create_session_factory()() as session:
+        drifted = report(session)
+        if drifted and args.rebuild:
+            print(f"Rebuilt {rebuild_balances(session)} account balances.")
+        if args.accruals:
+            audit_accruals(session, args.accruals)
+        if args.rollups:
+            print(f"Rebuilt {rebuild_rollups(session)} rollup rows.")
+        if args.purge_keys:
+            print(f"Purged {purge_posting_keys(session)} posting keys.")
@@ -0,0 +1,59 @@
+from collections import namedtuple
+from decimal import Decimal, ROUND_HALF_UP
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+from bank import Base
+
+# namedtuples have no per-instance __dict__, so a row costs little more than the tuple the driver returns
+AccountRow = namedtuple("AccountRow", ["account_id", "account_number", "account_type", "balance"])
+TransactionRow = namedtuple("TransactionRow", ["transaction_id", "date", "amount", "transaction_type"])
+
+
+def account_table():
+    """
+    The account table of the models. Reading through the tables skips the identity map and instance state of the ORM. They are looked
+    up when a query runs because the models import this module before their tables exist
+    """
+    return Base.metadata.tables["account"]
+
+
+def transaction_table():
+    """The transactions table of the models"""
+    return Base.metadata.tables["transactions"]
+
+
+def account_rows(session: Session) -> list:
+    """Returns an AccountRow for every account reachable from the session, ordered by account number"""
+    a = account_table().c
+    stmt = select(a.account_id, a.account_number, a.account_type, a.balance).order_by(a.account_number)
+    return [AccountRow._make(row) for row in session.execute(stmt)]
+
+
+def find_account(session: Session, account_number: str):
+    """Returns the AccountRow of the account with the given number, or None"""
+    a = account_table().c
+    stmt = select(a.account_id, a.account_number, a.account_type, a.balance).where(a.account_number == account_number)
+    row = session.execute(stmt).first()
+    return AccountRow._make(row) if row else None
+
+
+def transaction_history(session: Session, account_id: int) -> list:
+    """Returns a TransactionRow for every transaction of the account from the earliest to the latest, sorted by SQLite on the account index"""
+    t = transaction_table().c
+    stmt = (
+        select(t.transaction_id, t.date, t.amount, t.transaction_type)
+        .where(t.account_id == account_id)
+        .order_by(t.date, t.transaction_id)
+    )
+    return [TransactionRow._make(row) for row in session.execute(stmt)]
+
+
+def format_account(row: AccountRow) -> str:
+    """Formats an account the same way as Account.display"""
+    balance = Decimal(row.balance or 0.0).quantize(Decimal("0.01"), rounding=ROUND_HALF_UP)
+    return f"{row.account_type[0].upper() + row.account_type[1:]}#{row.account_number},\tbalance: ${balance:,.2f}"
+
+
+def format_transaction(row: TransactionRow) -> str:
+    """Formats a transaction the same way as Transaction.__str__"""
+    return f"{row.date}, ${Decimal(row.amount):,.2f}"
@@ -0,0 +1,106 @@
+from collections import namedtuple
+from sqlalchemy import Integer, String, Float, select, delete, func, case, inspect
+from sqlalchemy.dialects.sqlite import insert
+from sqlalchemy.orm import mapped_column, Session
+from bank import Base
+from transactions import Transaction
+from account import Account
+from sharding import fan_out
+
+# Deposits and withdrawals are the credits and debits of common transactions, interest is credited and low balance fees are debited
+MonthTotals = namedtuple("MonthTotals", ["month", "account_type", "deposits", "withdrawals", "interest", "fees", "transactions"])
+
+
+class TransactionRollup(Base):
+    """
+    The TransactionRollup keeps the running credit and debit totals of every month, account type and transaction type, so bank-wide
+    totals are read from a handful of rows instead of aggregating the transactions table. Each account's postings roll up on the
+    account's own shard
+    """
+
+    __tablename__ = "transaction_rollup"
+
+    month = mapped_column(String, primary_key = True)
+    account_type = mapped_column(String, primary_key = True)
+    transaction_type = mapped_column(String, primary_key = True)
+    credits = mapped_column(Float, nullable = False, default = 0.0)
+    credit_count = mapped_column(Integer, nullable = False, default = 0)
+    debits = mapped_column(Float, nullable = False, default = 0.0)
+    debit_count = mapped_column(Integer, nullable = False, default = 0)
+
+    # Rows are only ever reached through the primary key
+    __table_args__ = {"sqlite_with_rowid": False}
+
+
+def roll_up(session: Session, account, date: str, amount: float, transaction_type: str) -> None:
+    """
+    Adds a posting to the rollup of its month in the session's transaction, so it is committed together with the posting. The upsert
+    increments the row in SQL and never reads it, and it runs on the shard of the account
+    """
+    credit, debit = (amount, 0.0) if amount >= 0 else (0.0, amount)
+    stmt = insert(TransactionRollup).values(month = date[:7], account_type = account.account_type, transaction_type = transaction_type,
+                                            credits = credit, credit_count = int(amount >= 0), debits = debit, debit_count = int(amount < 0))
+    stmt = stmt.on_conflict_do_update(
+        index_elements = ["month", "account_type", "transaction_type"],
+        set_ = {
+            "credits": TransactionRollup.credits + stmt.excluded.credits,
+            "credit_count": TransactionRollup.credit_count + stmt.excluded.credit_count,
+            "debits": TransactionRollup.debits + stmt.excluded.debits,
+            "debit_count": TransactionRollup.debit_count + stmt.excluded.debit_count,
+        },
+    )
+    shard_id = inspect(account).identity_token
+    session.execute(stmt, bind_arguments = {"shard_id": shard_id} if shard_id is not None else None)
+
+
+def month_totals(session: Session, month: str = None) -> list:
+    """
+    Returns the MonthTotals of every month and account type, or only of the month YYYY-MM, newest month first. The rollup rows of
+    every shard are added together
+    """
+    totals = {}
+    for month_, account_type, transaction_type, credits, credit_count, debits, debit_count in fan_out(session, lambda s: _rollup_rows(s, month)):
+        row = totals.setdefault((month_, account_type), [0.0, 0.0, 0.0, 0.0, 0])
+        if transaction_type == "Common":
+            row[0] += credits
+            row[1] -= debits
+        elif transaction_type == "Interests":
+            row[2] += credits + debits
+        elif transaction_type == "LowBalance":
+            row[3] -= credits + debits
+        row[4] += credit_count + debit_count
+    rows = [MonthTotals(month_, account_type, *row) for (month_, account_type), row in sorted(totals.items())]
+    return sorted(rows, key = lambda row: row.month, reverse = True)
+
+
+def _rollup_rows(session: Session, month: str = None) -> list:
+    """The rollup rows of one shard"""
+    stmt = select(TransactionRollup.month, TransactionRollup.account_type, TransactionRollup.transaction_type, TransactionRollup.credits,
+                  TransactionRollup.credit_count, TransactionRollup.debits, TransactionRollup.debit_count)
+    if month is not None:
+        stmt = stmt.where(TransactionRollup.month == month)
+    return session.execute(stmt).all()
+
+
+def rebuild_rollups(session: Session) -> int:
+    """Recomputes the rollups of every shard from its transactions, for databases that predate them, and returns the number of rows"""
+    return sum(fan_out(session, lambda shard: [_rebuild(shard)]))
+
+
+def _rebuild(session: Session) -> int:
+    """Rebuild the rollups of one shard in a single INSERT ... SELECT"""
+    credit = Transaction.amount >= 0
+    stmt = (
+        select(
+            func.substr(Transaction.date, 1, 7), Account.account_type, Transaction.transaction_type,
+            func.sum(case((credit, Transaction.amount), else_ = 0.0)), func.sum(case((credit, 1), else_ = 0)),
+            func.sum(case((credit, 0.0), else_ = Transaction.amount)), func.sum(case((credit, 0), else_ = 1)),
+        )
+        .join(Account, Account.account_id == Transaction.account_id)
+        .group_by(func.substr(Transaction.date, 1, 7), Account.account_type, Transaction.transaction_type)
+    )
+    session.execute(delete(TransactionRollup))
+    result = session.execute(insert(TransactionRollup).from_select(
+        ["month", "account_type", "transaction_type", "credits", "credit_count", "debits", "debit_count"], stmt))
+    session.commit()
+    return result.rowcount
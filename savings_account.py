@@ -4,6 +4,9 @@ from datetime import datetime
 import calendar
 from utils import get_last_day_of_month
 from transactions import Transaction
+from accrual import accrue, average_daily_balance
+from idempotency import find_posting, record_posting, commit_posting
+from rollup import roll_up
 from exceptions import OverdrawError, TransactionLimitError, TransactionSequenceError
 import logging
 from sqlalchemy import Integer, ForeignKey, Float
@@ -21,7 +24,8 @@ class SavingAccount(Account):
     daily_limit = mapped_column(Integer, default = 2)
     monthly_limit = mapped_column(Integer, default = 5)
     interest_rate = mapped_column(Float, default = 0.33 / 100)
-    __mapper_args__ = {"polymorphic_identity": "savings"}
+    # Queries on Account join this table right away, so bank-wide loops do not load the subtype columns one account at a time
+    __mapper_args__ = {"polymorphic_identity": "savings", "polymorphic_load": "inline"}
     
 
     def __init__(self, account_type = "savings", *args, **kwargs):
@@ -29,8 +33,11 @@ class SavingAccount(Account):
         super().__init__(account_type, *args, **kwargs)
     
     
-    def add_transaction(self, session: Session, amount: float, date: str) -> bool:
-        """This function is used to add transaction to saving account, subject to daily and monthly transaction frequency limits"""
+    def add_transaction(self, session: Session, amount: float, date: str, idempotency_key: str = None) -> bool:
+        """This function is used to add transaction to saving account, subject to daily and monthly transaction frequency limits.
+        A posting retried with the same idempotency_key is not posted again and returns the original result"""
+        if idempotency_key is not None and find_posting(session, self.account_id, idempotency_key) is not None:
+            return True
         trans_date = datetime.strptime(date, "%Y-%m-%d")
         # daily = trans_date.date()
         year, month = trans_date.year, trans_date.month
@@ -62,8 +69,13 @@ class SavingAccount(Account):
         new_transaction = Transaction(session, date = date, amount = amount, account_id = self.account_id, \
                                       transaction_type = "Common")
         session.add(new_transaction)
+        accrue(session, self, date, amount)
+        roll_up(session, self, date, amount, "Common")
         self.balance += amount
-        session.commit()
+        # Recorded last so no autoflush inserts the key before commit_posting, which is where a concurrent duplicate is caught
+        if idempotency_key is not None:
+            record_posting(session, self.account_id, idempotency_key, new_transaction.transaction_id)
+        commit_posting(session, self.account_id, idempotency_key)
         return True
 
 
@@ -76,13 +88,16 @@ class SavingAccount(Account):
             cur_month = datetime.strptime(interests_date, "%Y-%m-%d").strftime("%B")
             raise TransactionSequenceError(cur_month)
 
-        amount = self.get_balance(session) * Decimal(self.interest_rate)
+        # Interest is paid on the average daily balance of the month, kept up to date by every posting
+        amount = Decimal(average_daily_balance(session, self, interests_date)) * Decimal(self.interest_rate)
         interests = Transaction(session, date = interests_date, amount = float(amount), \
                                 account_id = self.account_id, transaction_type = "Interests")
         session.add(interests)
+        accrue(session, self, interests_date, float(amount))
+        roll_up(session, self, interests_date, float(amount), "Interests")
         self.balance += float(amount)
-        session.commit()
         logging.debug(f"Created transaction: {self.account_number}, {float(amount)}")
+        session.commit()
         self.latest_interest_date = interests_date
         return None
 
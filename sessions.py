@@ -0,0 +1,80 @@
+import os
+import time
+import logging
+from collections import deque
+from contextlib import contextmanager
+from sqlalchemy.orm import Session, sessionmaker
+
+# close: a new session per operation, closed afterwards so everything it loaded is detached and can be freed
+# expunge: one session, emptied after every operation
+# expire: one session, whose objects are expired after every operation so only the ones still referenced stay in memory
+# keep: one session that keeps everything, the behaviour of long-running processes before scoping
+SESSION_POLICIES = ("close", "expunge", "expire", "keep")
+DEFAULT_POLICY = "close"
+SAMPLES = 1000
+
+
+class SessionScope:
+    """
+    The SessionScope hands out the session for one operation of a long-running CLI or GUI and applies the session policy when the
+    operation ends. It also samples the size of the identity map after every operation, keeping only the latest SAMPLES samples
+    """
+
+    def __init__(self, session_factory: sessionmaker, policy: str = None):
+        """The policy is read from the BANK_SESSION_POLICY environment variable unless given"""
+        policy = policy or os.environ.get("BANK_SESSION_POLICY", DEFAULT_POLICY)
+        if policy not in SESSION_POLICIES:
+            raise ValueError(f"Unknown session policy {policy!r}, expected one of {', '.join(SESSION_POLICIES)}")
+        self.session_factory = session_factory
+        self.policy = policy
+        self.operations = 0
+        self.samples = deque(maxlen = SAMPLES)
+        self._started = time.monotonic()
+        self._session = None
+
+    @contextmanager
+    def __call__(self, label: str = "operation"):
+        """Yield the session for one operation, roll it back if the operation fails and apply the policy afterwards"""
+        if self._session is None:
+            self._session = self.session_factory()
+        session = self._session
+        try:
+            yield session
+        except BaseException:
+            session.rollback()
+            raise
+        finally:
+            self._end_operation(session, label)
+
+    def _end_operation(self, session: Session, label: str) -> None:
+        """Sample the identity map and release what the policy says to release"""
+        self.operations += 1
+        size = len(session.identity_map)
+        self.samples.append((time.monotonic() - self._started, label, size))
+        logging.debug(f"Identity map: {size} objects after {label}")
+        if self.policy == "close":
+            session.close()
+            self._session = None
+        elif self.policy == "expunge":
+            session.expunge_all()
+        elif self.policy == "expire":
+            session.expire_all()
+
+    def close(self) -> None:
+        """Close the session kept between operations, if any"""
+        if self._session is not None:
+            self._session.close()
+            self._session = None
+
+    def report(self, buckets: int = 10) -> str:
+        """Describe the identity-map size over time, the sampled operations are split into buckets of equal length"""
+        if not self.samples:
+            return f"Session policy {self.policy}: no operations yet."
+        samples = list(self.samples)
+        size = max(1, -(-len(samples) // buckets))
+        lines = [f"Session policy {self.policy}: {self.operations} operations, identity map after the last {len(samples)}:"]
+        for start in range(0, len(samples), size):
+            chunk = samples[start:start + size]
+            sizes = [objects for _, _, objects in chunk]
+            lines.append(f"  {chunk[0][0]:>8.0f}s - {chunk[-1][0]:>8.0f}s: min {min(sizes)}, avg {sum(sizes) / len(sizes):.1f}, max {max(sizes)} objects")
+        return "\n".join(lines)
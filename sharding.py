@@ -0,0 +1,105 @@
+from concurrent.futures import ThreadPoolExecutor
+from sqlalchemy.ext.horizontal_shard import ShardedSession
+from sqlalchemy.orm import sessionmaker, Session
+from sqlalchemy.sql import operators, visitors
+from sqlalchemy.sql.elements import BinaryExpression, BindParameter
+
+# The bank row and anything else that is not owned by an account lives on the first shard
+BANK_SHARD = "0"
+SHARD_KEYS = ("account_id", "account_number")
+
+
+class ShardRouter:
+    """
+    The ShardRouter spreads the accounts across several SQLite files so that each file has its own writer lock. An account and all of
+    its transactions live on the shard picked from the account id, so every posting only ever locks one file. Account ids are unique
+    across the bank while transaction ids are only unique within their shard
+    """
+
+    def __init__(self, engines: list):
+        """Route between the engines of the shards, the shard ids are the positions of the engines in the list"""
+        self.engines = {str(i): engine for i, engine in enumerate(engines)}
+
+    def shard_for(self, account_id) -> str:
+        """Account ids are handed out sequentially, so taking them modulo the shard count spreads new accounts evenly"""
+        return str((int(account_id) - 1) % len(self.engines))
+
+    def sessionmaker(self) -> sessionmaker:
+        """Return a session factory whose sessions route every statement to the right shard"""
+        return sessionmaker(
+            class_ = ShardedSession,
+            shards = self.engines,
+            shard_chooser = self._shard_chooser,
+            identity_chooser = self._identity_chooser,
+            execute_chooser = self._execute_chooser,
+            info = {"shards": self.engines, "router": self},
+        )
+
+    def _shard_chooser(self, mapper, instance, clause = None) -> str:
+        """Pick the shard a new object is written to: accounts and transactions follow their account id"""
+        account_id = getattr(instance, "account_id", None)
+        if account_id is None:
+            return BANK_SHARD
+        return self.shard_for(account_id)
+
+    def _identity_chooser(self, mapper, primary_key, *, lazy_loaded_from, **kw) -> list:
+        """Pick the shards that may hold the object with the given primary key"""
+        if lazy_loaded_from:
+            return [lazy_loaded_from.identity_token]
+        column = mapper.primary_key[0]
+        if column.key == "account_id":
+            return [self.shard_for(primary_key[0])]
+        if column.table.name == "bank":
+            return [BANK_SHARD]
+        return list(self.engines)
+
+    def _execute_chooser(self, orm_context) -> list:
+        """
+        Pick the shards a statement has to run on, statements that do not name an account run on all of them. Only SELECTs have load
+        options, so UPDATEs and DELETEs are routed by their WHERE clause alone
+        """
+        if orm_context.is_select and orm_context.lazy_loaded_from:
+            return [orm_context.lazy_loaded_from.identity_token]
+        mapper = orm_context.bind_mapper
+        if mapper is not None and mapper.local_table.name == "bank":
+            return [BANK_SHARD]
+        shard_ids = set()
+        for key, value in _equality_criteria(orm_context.statement, orm_context.parameters):
+            if value is not None:
+                shard_ids.add(self.shard_for(value))
+        return sorted(shard_ids) or list(self.engines)
+
+
+def _equality_criteria(statement, parameters = None):
+    """
+    Yields (column key, value) for every `column == value` comparison on an account id or account number in the statement. Values that
+    are only supplied at execution time, like the primary key of session.get(), are looked up in the execution parameters
+    """
+    parameters = parameters if isinstance(parameters, dict) else {}
+    for element in visitors.iterate(statement):
+        if not isinstance(element, BinaryExpression) or element.operator is not operators.eq:
+            continue
+        for column, value in ((element.left, element.right), (element.right, element.left)):
+            if getattr(column, "key", None) in SHARD_KEYS and isinstance(value, BindParameter):
+                yield column.key, parameters.get(value.key, value.effective_value)
+
+
+def fan_out(session: Session, fn) -> list:
+    """
+    Runs fn(session) and returns the list it produces. On a sharded session fn runs once per shard, in parallel and each with its
+    own session, and the lists are merged. The caller's session is expired afterwards so it sees whatever the shards changed
+    """
+    engines = session.info.get("shards")
+    if not engines:
+        return list(fn(session))
+    with ThreadPoolExecutor(max_workers = len(engines)) as pool:
+        futures = [pool.submit(_run_on_shard, engine, fn) for engine in engines.values()]
+        results = [item for future in futures for item in future.result()]
+    session.expire_all()
+    return results
+
+
+def _run_on_shard(engine, fn) -> list:
+    """Runs fn against a single shard with a short-lived session"""
+    with Session(engine) as session:
+        return list(fn(session))
@@ -0,0 +1,227 @@
+import os
+import sys
+import time
+import random
+import logging
+import argparse
+import statistics
+from datetime import datetime, timedelta
+from sqlalchemy import create_engine
+from sqlalchemy.orm import sessionmaker
+from database import create_schema
+from bank import Bank
+from account import Account
+from savings_account import SavingAccount
+from checking_account import CheckingAccount
+from sessions import SessionScope
+from exceptions import OverdrawError, TransactionLimitError, TransactionSequenceError
+
+
+logging.basicConfig(
+    filename = "soak.log",
+    level = logging.INFO,
+    format = "%(asctime)s|%(levelname)s|%(message)s",
+    datefmt = "%Y-%m-%d %H:%M:%S"
+)
+
+# Relative weights of the operations of a teller station over a day, the month-end run happens whenever the simulated calendar
+# reaches a new month
+WORKLOAD = {
+    "open account": 4,
+    "deposit": 40,
+    "withdrawal": 32,
+    "history": 20,
+    "summary": 3,
+    "interest and fees": 1,
+}
+RESERVOIR_SIZE = 10000
+OPERATIONS_PER_DAY = 100
+
+
+class LatencyRecorder:
+    """
+    Keeps the latencies of one operation: every sample of the current reporting window, and a fixed-size random reservoir of the whole
+    run, so that a day-long soak does not grow the harness's own memory
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.errors = 0
+        self.window = []
+        self.reservoir = []
+
+    def record(self, seconds: float) -> None:
+        """Record the latency of one call"""
+        self.count += 1
+        self.window.append(seconds)
+        if len(self.reservoir) < RESERVOIR_SIZE:
+            self.reservoir.append(seconds)
+        else:
+            index = random.randrange(self.count)
+            if index < RESERVOIR_SIZE:
+                self.reservoir[index] = seconds
+
+
+def percentiles(samples: list) -> tuple:
+    """Return the p50, p95 and p99 of the samples in milliseconds"""
+    if len(samples) < 2:
+        value = samples[0] * 1000 if samples else 0.0
+        return value, value, value
+    cuts = statistics.quantiles(samples, n = 100, method = "inclusive")
+    return cuts[49] * 1000, cuts[94] * 1000, cuts[98] * 1000
+
+
+def rss_mb() -> float:
+    """Current resident set size of the process, or the peak where the current one is not available"""
+    try:
+        with open("/proc/self/statm") as statm:
+            return int(statm.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2 ** 20
+    except OSError:
+        # resource only exists on Unix, and /proc on Linux
+        import resource
+        peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return peak / 2 ** 20 if sys.platform == "darwin" else peak / 2 ** 10
+
+
+def database_mb(path: str) -> float:
+    """Size of the database file and its journal"""
+    return sum(os.path.getsize(name) for name in (path, f"{path}-journal", f"{path}-wal") if os.path.exists(name)) / 2 ** 20
+
+
+class Soak:
+    """
+    The Soak drives a mixed teller workload through the real Bank, CheckingAccount and SavingAccount APIs for a fixed duration, one
+    session scope per operation as the CLI does, and reports the latency percentiles of every operation together with the memory of the
+    process and the size of the database over time. The simulated calendar moves forward one day every OPERATIONS_PER_DAY operations,
+    so postings also hit the daily and monthly limits of savings accounts and overdrafts, while the occasional interest run of a single
+    account makes the rest of its month's postings out of order
+    """
+
+    def __init__(self, path: str, seed: int = None):
+        self.path = path
+        engine = create_engine(f"sqlite:///{path}")
+        create_schema(engine)
+        self.scope = SessionScope(sessionmaker(bind = engine))
+        self.random = random.Random(seed)
+        self.recorders = {name: LatencyRecorder() for name in list(WORKLOAD) + ["month end"]}
+        self.outcomes = {}
+        self.account_ids = []
+        self.day = datetime(2024, 1, 1)
+        self.operations = 0
+        with self.scope("load bank") as session:
+            if session.get(Bank, 1) is None:
+                session.add(Bank())
+                session.commit()
+            self.account_ids = [account_id for account_id, in session.query(Account.account_id)]
+
+    def run(self, duration: float, report_every: float) -> None:
+        """Run the workload for duration seconds, printing a report every report_every seconds"""
+        names = list(WORKLOAD)
+        weights = [WORKLOAD[name] for name in names]
+        started = time.monotonic()
+        next_report = started + report_every
+        print(f"{'elapsed':>8} {'ops':>8} {'rss MB':>8} {'db MB':>8}  slowest p99")
+        while time.monotonic() - started < duration:
+            name = self.random.choices(names, weights)[0]
+            if not self.account_ids:
+                name = "open account"
+            self._timed(name)
+            self.operations += 1
+            if self.operations % OPERATIONS_PER_DAY == 0:
+                if (self.day + timedelta(days = 1)).month != self.day.month:
+                    self._timed("month end")
+                self.day += timedelta(days = 1)
+            if time.monotonic() >= next_report:
+                self._report_window(time.monotonic() - started)
+                next_report += report_every
+        if any(recorder.window for recorder in self.recorders.values()):
+            self._report_window(time.monotonic() - started)
+        self.scope.close()
+        self._report_totals()
+
+    def _timed(self, name: str) -> None:
+        """Run one operation, recording its latency and its outcome"""
+        operation = getattr(self, "_" + name.replace(" ", "_"))
+        start = time.perf_counter()
+        try:
+            with self.scope(name) as session:
+                outcome = operation(session)
+        except (OverdrawError, TransactionLimitError, TransactionSequenceError) as e:
+            outcome = type(e).__name__
+        except Exception as e:
+            self.recorders[name].errors += 1
+            outcome = type(e).__name__
+            logging.error(f"{name}: {type(e).__name__}: {repr(e)}")
+        self.recorders[name].record(time.perf_counter() - start)
+        key = (name, outcome or "ok")
+        self.outcomes[key] = self.outcomes.get(key, 0) + 1
+
+    def _account(self, session):
+        """A random existing account"""
+        return session.get(Account, self.random.choice(self.account_ids))
+
+    def _date(self) -> str:
+        return self.day.strftime("%Y-%m-%d")
+
+    def _open_account(self, session):
+        account = SavingAccount() if self.random.random() < 0.5 else CheckingAccount()
+        account.generate_account_number(session)
+        session.add(account)
+        session.commit()
+        self.account_ids.append(account.account_id)
+
+    def _deposit(self, session):
+        self._account(session).add_transaction(session, round(self.random.uniform(10, 2000), 2), self._date())
+
+    def _withdrawal(self, session):
+        # Large enough that some of them overdraw
+        self._account(session).add_transaction(session, -round(self.random.uniform(10, 1500), 2), self._date())
+
+    def _history(self, session):
+        self._account(session).list_transactions(session)
+
+    def _summary(self, session):
+        session.get(Bank, 1).account_rows(session)
+
+    def _interest_and_fees(self, session):
+        account = self._account(session)
+        if account.latest_transaction_date(session) is None:
+            return "no transactions"
+        account.interests_and_fees(session)
+
+    def _month_end(self, session):
+        session.get(Bank, 1).month_end(session)
+
+    def _report_window(self, elapsed: float) -> None:
+        """Print the memory, the database size and the slowest p99 of the window, then start a new window"""
+        slowest = max(((percentiles(recorder.window)[2], name) for name, recorder in self.recorders.items() if recorder.window),
+                      default = (0.0, "-"))
+        line = f"{elapsed:>7.0f}s {self.operations:>8} {rss_mb():>8.1f} {database_mb(self.path):>8.2f}  {slowest[1]} {slowest[0]:.1f}ms"
+        print(line)
+        logging.info(line)
+        for recorder in self.recorders.values():
+            recorder.window = []
+
+    def _report_totals(self) -> None:
+        """Print the latency percentiles of every operation over the whole run and how the operations ended"""
+        print(f"\n{'operation':<18} {'count':>8} {'errors':>7} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for name, recorder in self.recorders.items():
+            p50, p95, p99 = percentiles(recorder.reservoir)
+            print(f"{name:<18} {recorder.count:>8} {recorder.errors:>7} {p50:>8.2f} {p95:>8.2f} {p99:>8.2f}")
+        print("\noutcomes")
+        for (name, outcome), count in sorted(self.outcomes.items()):
+            print(f"  {name:<18} {outcome:<26} {count:>8}")
+        print(f"\nrss {rss_mb():.1f} MB, database {database_mb(self.path):.2f} MB, {len(self.account_ids)} accounts, simulated up to {self._date()}")
+        print(self.scope.report())
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description = "Soak test the bank with a mixed workload")
+    parser.add_argument("--duration", type = float, default = 60, help = "seconds to run (default 60)")
+    parser.add_argument("--report-every", type = float, default = 10, help = "seconds between progress lines (default 10)")
+    parser.add_argument("--database", default = "soak.db", help = "database file to use, never bank.db (default soak.db)")
+    parser.add_argument("--seed", type = int, help = "random seed for a repeatable workload")
+    args = parser.parse_args()
+    if os.path.basename(args.database) == "bank.db":
+        parser.error("the soak test must not run against bank.db")
+    Soak(args.database, args.seed).run(args.duration, args.report_every)
@@ -0,0 +1,48 @@
+import os
+import sys
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+# database imports bank, which defines Base before the models, the same order the CLI and the GUI use
+import database
+from bank import Bank
+from checking_account import CheckingAccount
+from savings_account import SavingAccount
+
+
+@pytest.fixture
+def session_factory(tmp_path, monkeypatch):
+    """A single bank.db in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    return database.create_session_factory(shards = 1, memory = False)
+
+
+@pytest.fixture
+def sharded_session_factory(tmp_path, monkeypatch):
+    """Three shards bank_0.db to bank_2.db in a temporary directory"""
+    monkeypatch.chdir(tmp_path)
+    return database.create_session_factory(shards = 3, memory = False)
+
+
+@pytest.fixture
+def open_accounts():
+    """Returns a function that opens count accounts in a session, see _open_accounts"""
+    return _open_accounts
+
+
+def _open_accounts(session, count: int, deposit: float = 100.0, date: str = "2024-01-02") -> list:
+    """Create the bank and count accounts, alternating checking and savings, each with one deposit, and return their ids"""
+    if session.get(Bank, 1) is None:
+        session.add(Bank())
+        session.commit()
+    account_ids = []
+    for i in range(count):
+        account = CheckingAccount() if i % 2 == 0 else SavingAccount()
+        account.generate_account_number(session)
+        session.add(account)
+        session.commit()
+        if deposit is not None:
+            account.add_transaction(session, deposit, date)
+        account_ids.append(account.account_id)
+    return account_ids
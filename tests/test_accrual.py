@@ -0,0 +1,59 @@
+import pytest
+from sqlalchemy import delete
+from account import Account
+from accrual import BalanceAccrual, average_daily_balance, recompute_average_daily_balances
+
+
+def assert_matches_recomputed(session, account, period_end, expected = None):
+    """The constant-time average equals the one recomputed from the transactions, and the expected value if given"""
+    accrued = average_daily_balance(session, account, period_end)
+    assert accrued == pytest.approx(recompute_average_daily_balances(session, period_end)[account.account_id])
+    if expected is not None:
+        assert accrued == pytest.approx(expected)
+
+
+def test_mid_month_posting(session_factory, open_accounts):
+    with session_factory() as session:
+        account_id, = open_accounts(session, 1, deposit = 100.0, date = "2024-01-02")
+        account = session.get(Account, account_id)
+        account.add_transaction(session, 50.0, "2024-01-15")
+        # 0 on the 1st, 100 from the 2nd to the 14th, 150 from the 15th to the 31st
+        assert_matches_recomputed(session, account, "2024-01-31", (13 * 100.0 + 17 * 150.0) / 31)
+
+
+def test_first_posting_after_the_month_changes(session_factory, open_accounts):
+    with session_factory() as session:
+        account_id, = open_accounts(session, 1, deposit = 100.0, date = "2024-01-10")
+        account = session.get(Account, account_id)
+        account.add_transaction(session, -40.0, "2024-01-20")
+        account.add_transaction(session, 30.0, "2024-02-10")
+        # 60 carried in from January until the 9th, 90 from the 10th to the 29th
+        assert_matches_recomputed(session, account, "2024-02-29", (9 * 60.0 + 20 * 90.0) / 29)
+
+
+def test_interest_and_low_balance_fee_on_the_last_day(session_factory, open_accounts):
+    with session_factory() as session:
+        # A checking account under its low balance pays the fee on top of its interest
+        account_id, = open_accounts(session, 1, deposit = 80.0, date = "2024-03-05")
+        account = session.get(Account, account_id)
+        account.interests_and_fees(session)
+        assert account.latest_transaction_date(session, "LowBalance") == "2024-03-31"
+        assert_matches_recomputed(session, account, "2024-03-31")
+        # 80 from the 5th to the 30th, and on the 31st the interest paid on the month's average less the fee
+        interest = 27 * 80.0 / 31 * account.interest_rate
+        assert average_daily_balance(session, account, "2024-03-31") == pytest.approx((26 * 80.0 + 80.0 + interest - 5.75) / 31)
+
+
+def test_account_opened_before_accruals_existed(session_factory, open_accounts):
+    with session_factory() as session:
+        account_id, = open_accounts(session, 1, deposit = 100.0, date = "2024-01-02")
+        session.execute(delete(BalanceAccrual))
+        session.commit()
+        account = session.get(Account, account_id)
+        # Without an accrual a month without postings averages the current balance
+        assert_matches_recomputed(session, account, "2024-02-29", 100.0)
+
+        # The first posting starts the accrual from the balance at the beginning of its month
+        account.add_transaction(session, 20.0, "2024-03-11")
+        assert session.get(BalanceAccrual, account_id) is not None
+        assert_matches_recomputed(session, account, "2024-03-31", (10 * 100.0 + 21 * 120.0) / 31)
@@ -0,0 +1,24 @@
+from directory import AccountDirectory
+
+
+def directory_of(*numbers):
+    directory = AccountDirectory()
+    for number in numbers:
+        directory.add(f"{number:09d}", "checking")
+    return directory
+
+
+def test_search_returns_number_order():
+    directory = directory_of(100, 2, 11, 1, 10, 21)
+    assert [number for number, _ in directory.search("1")] == ["000000001", "000000010", "000000011", "000000100"]
+    assert [number for number, _ in directory.search("")] == [f"{n:09d}" for n in (1, 2, 10, 11, 21, 100)]
+    assert [number for number, _ in directory.search("0001", limit = 2)] == ["000000001", "000000010"]
+
+
+def test_new_accounts_are_appended():
+    directory = directory_of(*range(1, 13))
+    assert directory._keys == sorted(directory._keys)
+    assert [number for number, _ in directory._accounts] == [f"{n:09d}" for n in range(1, 13)]
+    directory.add("000000012", "savings")
+    assert len(directory) == 12
+    assert directory.search("12") == [("000000012", "savings")]
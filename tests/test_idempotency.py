@@ -0,0 +1,65 @@
+import pytest
+from sqlalchemy import select, func
+from sqlalchemy.exc import IntegrityError
+import checking_account
+from account import Account
+from transactions import Transaction
+from accrual import BalanceAccrual
+from rollup import TransactionRollup
+from idempotency import record_posting, commit_posting
+
+
+def snapshot(session, account_id):
+    """Everything a posting changes: the balance, the transactions, the accrual and the rollups"""
+    session.expire_all()
+    accrual = session.get(BalanceAccrual, account_id)
+    return (
+        session.get(Account, account_id).balance,
+        session.scalar(select(func.count()).select_from(Transaction).where(Transaction.account_id == account_id)),
+        (accrual.last_date, accrual.balance, accrual.balance_days),
+        session.execute(select(TransactionRollup.month, TransactionRollup.account_type, TransactionRollup.transaction_type,
+                               TransactionRollup.credits, TransactionRollup.credit_count)).all(),
+    )
+
+
+def test_retry_with_the_same_key_posts_once(session_factory, open_accounts):
+    with session_factory() as session:
+        checking_id, savings_id = open_accounts(session, 2)
+        for account_id in (checking_id, savings_id):
+            account = session.get(Account, account_id)
+            assert account.add_transaction(session, 25.0, "2024-01-05", idempotency_key = "feed-1") is True
+            posted = snapshot(session, account_id)
+            assert account.add_transaction(session, 25.0, "2024-01-05", idempotency_key = "feed-1") is True
+            assert snapshot(session, account_id) == posted
+            assert posted[0] == 125.0
+
+
+def test_same_key_on_another_account_posts(session_factory, open_accounts):
+    with session_factory() as session:
+        first_id, second_id = open_accounts(session, 2)
+        session.get(Account, first_id).add_transaction(session, 25.0, "2024-01-05", idempotency_key = "feed-1")
+        session.get(Account, second_id).add_transaction(session, 25.0, "2024-01-05", idempotency_key = "feed-1")
+        session.expire_all()
+        assert session.get(Account, first_id).balance == 125.0
+        assert session.get(Account, second_id).balance == 125.0
+
+
+def test_concurrent_duplicate_is_rolled_back(session_factory, open_accounts, monkeypatch):
+    with session_factory() as session:
+        account_id, = open_accounts(session, 1)
+        session.get(Account, account_id).add_transaction(session, 25.0, "2024-01-05", idempotency_key = "feed-1")
+        posted = snapshot(session, account_id)
+
+        # The probe ran before the other posting committed, so only the primary key of posting_keys can catch the duplicate
+        monkeypatch.setattr(checking_account, "find_posting", lambda *args: None)
+        assert session.get(Account, account_id).add_transaction(session, 25.0, "2024-01-05", idempotency_key = "feed-1") is True
+        assert snapshot(session, account_id) == posted
+
+
+def test_other_integrity_errors_are_raised(session_factory, open_accounts):
+    with session_factory() as session:
+        account_id, = open_accounts(session, 1)
+        session.get(Account, account_id).add_transaction(session, 25.0, "2024-01-05", idempotency_key = "feed-1")
+        record_posting(session, account_id, "feed-1", 0)
+        with pytest.raises(IntegrityError):
+            commit_posting(session, account_id, "feed-2")
@@ -0,0 +1,52 @@
+import pytest
+from sqlalchemy import event, select
+from account import Account
+from checking_account import CheckingAccount
+from savings_account import SavingAccount
+from bank import _month_end
+
+ACCOUNTS = 20
+# Per account the month-end run reads the latest transactions, the accrual and the next transaction id, then writes the interest
+STATEMENTS_PER_ACCOUNT = 10
+
+
+@pytest.fixture
+def statements(session_factory, open_accounts):
+    """Collects the SQL statements executed on the database"""
+    executed = []
+    with session_factory() as session:
+        open_accounts(session, ACCOUNTS)
+        engine = session.get_bind()
+    listener = lambda conn, cursor, statement, *args: executed.append(statement)
+    event.listen(engine, "before_cursor_execute", listener)
+    yield executed
+    event.remove(engine, "before_cursor_execute", listener)
+
+
+def test_loading_accounts_reads_subtype_columns_in_one_query(session_factory, statements):
+    with session_factory() as session:
+        accounts = session.scalars(select(Account)).all()
+        for account in accounts:
+            account.interest_rate
+            if isinstance(account, SavingAccount):
+                account.daily_limit
+            else:
+                account.low_balance
+        assert {type(account) for account in accounts} == {CheckingAccount, SavingAccount}
+        assert len(statements) == 1
+
+
+def test_get_reads_subtype_columns_in_one_query(session_factory, statements):
+    with session_factory() as session:
+        session.get(Account, 2).daily_limit
+        session.get(Account, 3).low_balance
+        assert len(statements) == 2
+
+
+def test_month_end_does_not_reload_accounts(session_factory, statements):
+    with session_factory() as session:
+        applied = _month_end(session)
+    assert len(applied) == ACCOUNTS
+    loads = [statement for statement in statements if statement.lstrip().startswith("SELECT") and "FROM account" in statement]
+    assert len(loads) == 1
+    assert len(statements) <= 1 + STATEMENTS_PER_ACCOUNT * ACCOUNTS
@@ -0,0 +1,75 @@
+import sqlite3
+import pytest
+from sqlalchemy import select, update, event
+from account import Account
+import ledger
+import database
+from exceptions import ShardCountError
+
+
+def test_update_with_where_clause_on_shards(sharded_session_factory, open_accounts):
+    with sharded_session_factory() as session:
+        open_accounts(session, 6)
+        session.execute(update(Account).where(Account.account_id == 2).values(balance = 99.0))
+        session.commit()
+        assert sorted(session.scalars(select(Account.balance))) == [99.0] + [100.0] * 5
+
+
+def test_rebuild_balances_on_shards(sharded_session_factory, open_accounts):
+    with sharded_session_factory() as session:
+        open_accounts(session, 6)
+        session.execute(update(Account).where(Account.account_id == 2).values(balance = 99.0))
+        session.execute(update(Account).where(Account.account_id == 6).values(balance = 1.0))
+        session.commit()
+        assert len(list(ledger.verify_balances(session))) == 2
+
+        assert ledger.rebuild_balances(session) == 2
+        assert list(ledger.verify_balances(session)) == []
+        assert sorted(session.scalars(select(Account.balance))) == [100.0] * 6
+
+
+def test_rebuild_balances_single_database(session_factory, open_accounts):
+    with session_factory() as session:
+        open_accounts(session, 4)
+        session.execute(update(Account).where(Account.account_id == 3).values(balance = 5.0))
+        session.commit()
+        assert ledger.rebuild_balances(session) == 1
+        assert list(ledger.verify_balances(session)) == []
+
+
+def test_transaction_id_only_read_from_the_account_shard(sharded_session_factory, open_accounts):
+    with sharded_session_factory() as session:
+        open_accounts(session, 3)
+        queried = []
+        for shard_id, engine in session.info["shards"].items():
+            event.listen(engine, "before_cursor_execute",
+                         lambda conn, cursor, statement, *args, shard_id = shard_id:
+                         queried.append(shard_id) if "max(transactions.transaction_id)" in statement else None)
+        account = session.get(Account, 2)
+        account.add_transaction(session, 5.0, "2024-01-03")
+        assert queried == [session.info["router"].shard_for(2)]
+
+
+def test_shard_count_cannot_change(sharded_session_factory, open_accounts):
+    with sharded_session_factory() as session:
+        open_accounts(session, 6)
+    for shards in (4, 2, 1):
+        with pytest.raises(ShardCountError):
+            database.create_session_factory(shards = shards, memory = False)
+    with database.create_session_factory(shards = 3, memory = False)() as session:
+        assert session.get(Account, 6) is not None
+
+
+def test_single_database_cannot_become_sharded(session_factory, open_accounts):
+    with session_factory() as session:
+        open_accounts(session, 2)
+    with pytest.raises(ShardCountError):
+        database.create_session_factory(shards = 3, memory = False)
+
+
+def test_shard_count_stored_in_older_databases(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    sqlite3.connect("bank.db").close()
+    database.create_session_factory(shards = 1, memory = False)
+    with pytest.raises(ShardCountError):
+        database.create_session_factory(shards = 2, memory = False)
@@ -0,0 +1,45 @@
+from sqlalchemy import select, tuple_
+from sqlalchemy.orm import Session
+from account import Account
+from transactions import Transaction
+
+TRANSACTION_TYPES = ("Common", "Interests", "LowBalance")
+PAGE_SIZE = 50
+
+
+def search_transactions(session: Session, start_date: str = None, end_date: str = None, min_amount: float = None,
+                        max_amount: float = None, transaction_type: str = None, account_number: str = None,
+                        after: tuple = None, page_size: int = PAGE_SIZE):
+    """
+    Returns one page of the transactions matching every given filter, ordered by date, as a list of
+    (account_number, date, amount, transaction_type, cursor) together with the cursor of the next page, or None on the last page.
+    Dates are inclusive YYYY-MM-DD strings and amounts are signed, so withdrawals over $1,000 are max_amount = -1000.
+    The filtering runs in SQL on the transaction indexes and pages are fetched by seeking past the cursor of the previous page
+    instead of using an offset, so a late page costs the same as the first one
+    """
+    order = (Transaction.date, Transaction.transaction_id, Transaction.account_id)
+    stmt = (
+        select(Account.account_number, Transaction.date, Transaction.amount, Transaction.transaction_type, *order)
+        .join(Account, Account.account_id == Transaction.account_id)
+    )
+    if start_date:
+        stmt = stmt.where(Transaction.date >= start_date)
+    if end_date:
+        stmt = stmt.where(Transaction.date <= end_date)
+    if min_amount is not None:
+        stmt = stmt.where(Transaction.amount >= min_amount)
+    if max_amount is not None:
+        stmt = stmt.where(Transaction.amount <= max_amount)
+    if transaction_type:
+        stmt = stmt.where(Transaction.transaction_type == transaction_type)
+    if account_number:
+        stmt = stmt.where(Account.account_number == account_number)
+    if after:
+        stmt = stmt.where(tuple_(*order) > tuple_(*after))
+    stmt = stmt.order_by(*order).limit(page_size + 1)
+
+    # A sharded session returns one page per shard, so merge them before cutting the page
+    rows = sorted(session.execute(stmt), key = lambda row: row[4:])[:page_size + 1]
+    page = [(number, date, amount, transaction_type, tuple(cursor)) for number, date, amount, transaction_type, *cursor in rows[:page_size]]
+    next_cursor = page[-1][4] if len(rows) > page_size else None
+    return page, next_cursor
@@ -1,6 +1,6 @@
 from decimal import Decimal
 from datetime import datetime
-from sqlalchemy import Integer, String, ForeignKey, Float, DateTime
+from sqlalchemy import Integer, String, ForeignKey, Float, DateTime, Index, select, func
 from sqlalchemy.orm import mapped_column, relationship
 from bank import Base
 
@@ -17,14 +17,22 @@ class Transaction(Base):
     transaction_type = mapped_column(String, nullable = False)
     account = relationship("Account", back_populates="transactions")
 
+    # Cover the history of one account, searches by type or by amount, and date-ordered searches across all accounts
+    __table_args__ = (
+        Index("ix_transactions_account_date", "account_id", "date", "transaction_id"),
+        Index("ix_transactions_type_date", "transaction_type", "date", "transaction_id"),
+        Index("ix_transactions_date", "date", "transaction_id"),
+        Index("ix_transactions_amount", "amount"),
+    )
+
 
     def __init__(self, session, date: str, amount: float, account_id: int, transaction_type: str):
         """Initiate a transaction"""
-        last_transaction = session.query(Transaction).order_by(Transaction.transaction_id.desc()).first()
-        if not last_transaction:
-            self.transaction_id = 1
-        else:
-            self.transaction_id =  last_transaction.transaction_id + 1
+        # Transaction ids are only unique within a shard, so a sharded session only asks the shard of the account
+        router = session.info.get("router")
+        bind_arguments = {"shard_id": router.shard_for(account_id)} if router else None
+        last_transaction_id = session.scalar(select(func.max(Transaction.transaction_id)), bind_arguments = bind_arguments)
+        self.transaction_id = (last_transaction_id or 0) + 1
         self.date = date
         self.amount = amount
         self.account_id = account_id
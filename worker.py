@@ -0,0 +1,75 @@
+import queue
+import logging
+import threading
+from sessions import SessionScope
+
+
+class DBWorker:
+    """
+    The DBWorker runs every database operation of the GUI on one background thread with its own session, so the Tk main loop never
+    waits for a slow query or a SQLite lock. Jobs are callables taking the session and run in the order they were submitted. Their
+    results and errors are handed back to Tk through a queue that is polled with after(), so the callbacks always run on the main thread.
+    Each job runs in its own session scope, so results must be plain values rather than ORM objects
+    """
+
+    POLL_MS = 50
+
+    def __init__(self, root, session_factory, on_busy = None, policy = None):
+        """Start the worker thread and the polling loop, on_busy(bool) is called on the main thread whenever the worker starts or stops being busy"""
+        self.root = root
+        self.on_busy = on_busy
+        self.scope = SessionScope(session_factory, policy)
+        self._jobs = queue.Queue()
+        self._results = queue.Queue()
+        self._pending = 0
+        self._thread = threading.Thread(target = self._run, name = "db-worker", daemon = True)
+        self._thread.start()
+        self.root.after(self.POLL_MS, self._poll)
+
+    def submit(self, job, on_success = None, on_error = None) -> None:
+        """
+        Queue job(session) to run on the worker thread. on_success(result) or on_error(exception) is called on the main thread once it
+        finishes; errors without an on_error callback are passed to the Tk error handler like any other unexpected exception
+        """
+        self._pending += 1
+        if self._pending == 1 and self.on_busy:
+            self.on_busy(True)
+        self._jobs.put((job, on_success, on_error))
+
+    def stop(self) -> None:
+        """Let the queued jobs finish, then close the worker session"""
+        self._jobs.put(None)
+        self._thread.join()
+
+    def _run(self) -> None:
+        """Worker thread loop"""
+        while True:
+            item = self._jobs.get()
+            if item is None:
+                break
+            job, on_success, on_error = item
+            try:
+                with self.scope(getattr(job, "__name__", "job")) as session:
+                    result = job(session)
+            except Exception as e:
+                self._results.put((on_error, e, True))
+            else:
+                self._results.put((on_success, result, False))
+        self.scope.close()
+        logging.debug(self.scope.report())
+
+    def _poll(self) -> None:
+        """Deliver the finished jobs to their callbacks on the main thread"""
+        self.root.after(self.POLL_MS, self._poll)
+        while True:
+            try:
+                callback, value, failed = self._results.get_nowait()
+            except queue.Empty:
+                break
+            self._pending -= 1
+            if self._pending == 0 and self.on_busy:
+                self.on_busy(False)
+            if callback:
+                callback(value)
+            elif failed:
+                self.root.report_callback_exception(type(value), value, value.__traceback__)